@@ -0,0 +1,62 @@
+"""pydeck helpers"""
+
+import json
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+import pydeck as pdk
+
+
+class PrerenderedDeck(pdk.Deck):
+    """
+    JSON 化を生成時に一度だけ行う Deck。
+
+    st.pydeck_chart は描画のたびに to_json() を呼ぶので、st.cache_resource で
+    共有する Deck はこのクラスで作るとリランごとのシリアライズを省ける。
+    生成後に layers などを変更しても JSON には反映されない。
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._json = super().to_json()
+
+    def to_json(self) -> str:
+        return self._json
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedData:
+    """
+    JSON 化済みのレイヤデータ。
+
+    pdk.Layer の data には token を渡し、SplicedDeck が to_json() で
+    token を json に置き換える。
+    """
+
+    json: str
+    token: str = field(default_factory=lambda: f"__encoded_{uuid4().hex}__")
+
+    @classmethod
+    def dumps(cls, data: Any) -> "EncodedData":
+        return cls(json.dumps(data, separators=(",", ":")))
+
+
+class SplicedDeck(pdk.Deck):
+    """
+    JSON 化済みのレイヤデータ（EncodedData）を差し込む Deck。
+
+    データはキャッシュしておき、スタイルだけが変わるリランでは
+    小さな Deck 本体だけをシリアライズする。
+    """
+
+    def __init__(self, *args, encoded: Iterable[EncodedData] = (), **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._encoded = tuple(encoded)
+
+    def to_json(self) -> str:
+        text = super().to_json()
+        for data in self._encoded:
+            text = text.replace(json.dumps(data.token), data.json, 1)
+        return text
@@ -0,0 +1,194 @@
+"""GeoJSON loader
+
+HTTP 接続をプールした requests.Session で GeoJSON を取得し、
+ディスク（ETag / Last-Modified 付き）とメモリ（LRU）の 2 段でキャッシュする。
+ローダーはプロセス内で共有され、全セッションが同じキャッシュを使う。
+
+キャッシュを事前に用意しておけばオフラインでも動く（app/ から実行）:
+
+    python -m common.geojson_loader prefetch
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+JAPAN_GEOJSON_BASE = "https://raw.githubusercontent.com/ricewin/simplify-japan-geojson/refs/heads/main/GeoJson"
+PREFECTURE_LAYER = "prefecture"  # 都道府県界（市区町村は "01"〜"47"）
+
+CACHE_DIR = os.environ.get(
+    "GEOJSON_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "sandbox-of-streamlit", "geojson"),
+)
+MEMORY_ITEMS = 16  # メモリに保持する GeoJSON の数
+REVALIDATE_SECONDS = 24 * 60 * 60  # この間隔を過ぎたら条件付きリクエストで更新確認
+TIMEOUT = 10
+
+
+def japan_geojson_url(code: str) -> str:
+    """simplify-japan-geojson の URL（code は "prefecture" か都道府県コード 2 桁）。"""
+    return f"{JAPAN_GEOJSON_BASE}/{code}.json"
+
+
+class GeoJSONLoader:
+    """
+    GeoJSON を URL 単位でキャッシュして返すローダー。
+
+    1. メモリ（LRU）にあり、確認から REVALIDATE_SECONDS 以内ならそのまま返す
+    2. ディスクにあり、同じく新しければ読み込んで返す
+    3. それ以外は If-None-Match / If-Modified-Since 付きで取得（304 なら手元を使う）
+    4. 通信に失敗してもディスクに古いコピーがあればそれを返す
+
+    返す dict は全セッションで共有するので変更しないこと。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = CACHE_DIR,
+        memory_items: int = MEMORY_ITEMS,
+        revalidate_seconds: float = REVALIDATE_SECONDS,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.revalidate_seconds = revalidate_seconds
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=16))
+        # url -> (checked_at, data)
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._url_locks: dict[str, threading.Lock] = {}
+
+    def load(self, url: str) -> Any:
+        """url の GeoJSON を返す。"""
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        # 同じ URL の同時取得は 1 回にまとめる
+        with url_lock:
+            now = time.time()
+            with self._lock:
+                hit = self._memory.get(url)
+                if hit is not None:
+                    self._memory.move_to_end(url)
+            if hit is not None and now - hit[0] < self.revalidate_seconds:
+                return hit[1]
+
+            data = self._load_from_disk_or_network(url, hit, now)
+            with self._lock:
+                self._memory[url] = (now, data)
+                self._memory.move_to_end(url)
+                while len(self._memory) > self.memory_items:
+                    self._memory.popitem(last=False)
+            return data
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, f"{name}-{os.path.basename(url)}")
+        return base, f"{base}.meta"
+
+    def _load_from_disk_or_network(
+        self, url: str, hit: tuple[float, Any] | None, now: float
+    ) -> Any:
+        body_path, meta_path = self._paths(url)
+        meta = _read_meta(meta_path) if os.path.exists(body_path) else None
+
+        if (
+            meta is not None
+            and now - meta.get("checked_at", 0) < self.revalidate_seconds
+        ):
+            return hit[1] if hit is not None else _read_json(body_path)
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = self._session.get(url, headers=headers, timeout=TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException:
+            if meta is None:
+                raise
+            # オフライン: 手元のコピーを使う
+            return hit[1] if hit is not None else _read_json(body_path)
+
+        if response.status_code == 304 and meta is not None:
+            meta["checked_at"] = now
+            _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+            return hit[1] if hit is not None else _read_json(body_path)
+
+        data = response.json()
+        _atomic_write(body_path, response.content)
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": now,
+        }
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+        return data
+
+
+def _read_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def _read_meta(path: str) -> dict[str, Any] | None:
+    try:
+        return _read_json(path)
+    except OSError, ValueError:
+        return None
+
+
+def _atomic_write(path: str, content: bytes) -> None:
+    dirpath = os.path.dirname(path)
+    os.makedirs(dirpath, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=dirpath, delete=False) as tmp:
+        tmp.write(content)
+        tmp_name = tmp.name
+    os.replace(tmp_name, path)
+
+
+@cache
+def get_loader() -> GeoJSONLoader:
+    """プロセス全体で共有するローダー。"""
+    return GeoJSONLoader()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m common.geojson_loader",
+        description="simplify-japan-geojson をディスクキャッシュに取り込む",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_prefetch = sub.add_parser("prefetch", help="GeoJSON をまとめて取得する")
+    p_prefetch.add_argument(
+        "codes",
+        nargs="*",
+        default=[PREFECTURE_LAYER] + [f"{i:02d}" for i in range(1, 48)],
+        help='"prefecture" または都道府県コード（省略時はすべて）',
+    )
+    args = parser.parse_args(argv)
+
+    loader = get_loader()
+    for code in args.codes:
+        loader.load(japan_geojson_url(code))
+        print(f"{code}: cached", file=sys.stderr)
+    print(f"cache dir: {loader.cache_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
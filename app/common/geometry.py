@@ -0,0 +1,291 @@
+"""GeoJSON ポリゴンのフラットな座標バッファと集計"""
+
+import itertools
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import shapely
+from shapely import GeometryType
+
+
+@dataclass(frozen=True, slots=True)
+class FlatGeometry:
+    """
+    (Multi)Polygon を 1 本の座標配列にまとめたもの（GeoArrow と同じ入れ子オフセット）。
+
+    feature i のポリゴンは polygon_offsets[feature_offsets[i]:feature_offsets[i + 1]]、
+    ポリゴン j のリングは ring_offsets[polygon_offsets[j]:polygon_offsets[j + 1]]、
+    リング k の頂点は coords[ring_offsets[k]:ring_offsets[k + 1]]。
+    各ポリゴンの最初のリングが外周、残りが穴。
+    """
+
+    coords: np.ndarray  # (N, 2) float64, lon / lat
+    ring_offsets: np.ndarray  # (R + 1,) int64
+    polygon_offsets: np.ndarray  # (P + 1,) int64
+    feature_offsets: np.ndarray  # (F + 1,) int64
+
+    @property
+    def num_features(self) -> int:
+        return len(self.feature_offsets) - 1
+
+    @property
+    def num_polygons(self) -> int:
+        return len(self.polygon_offsets) - 1
+
+    @property
+    def num_rings(self) -> int:
+        return len(self.ring_offsets) - 1
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.coords)
+
+    @property
+    def nbytes(self) -> int:
+        """座標とオフセットの合計バイト数。"""
+        return (
+            self.coords.nbytes
+            + self.ring_offsets.nbytes
+            + self.polygon_offsets.nbytes
+            + self.feature_offsets.nbytes
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class GeometrySummary:
+    """bbox・中心・重心・件数をまとめた集計結果。"""
+
+    bbox: tuple[float, float, float, float]  # min_lon, min_lat, max_lon, max_lat
+    center: tuple[float, float]  # lat, lon（bbox の中心）
+    centroid: tuple[float, float]  # lat, lon（面積重心、穴を差し引く）
+    num_features: int
+    num_polygons: int
+    num_rings: int
+    num_vertices: int
+
+
+def _features(geojson: dict[str, Any]) -> list[dict[str, Any]]:
+    if "features" in geojson:
+        return geojson["features"]
+    if geojson.get("type") == "Feature":
+        return [geojson]
+    return [{"geometry": geojson}]  # ジオメトリ単体
+
+
+def properties(geojson: dict[str, Any]) -> list[dict[str, Any] | None]:
+    """feature ごとの properties（flatten と同じ順）。"""
+    return [feature.get("properties") for feature in _features(geojson)]
+
+
+def rough_center(geojson: dict[str, Any]) -> tuple[float, float]:
+    """最初の feature の外周の頂点平均（lat, lon）。summarize より粗いが速い。"""
+    geom = geojson["features"][0]["geometry"]
+
+    if geom["type"] == "Polygon":
+        coords = geom["coordinates"][0]
+    elif geom["type"] == "MultiPolygon":
+        coords = geom["coordinates"][0][0]  # 最初のポリゴンの外周
+    else:
+        raise ValueError("対応していないジオメトリタイプです")
+
+    lon, lat = zip(*coords)
+    return sum(lat) / len(lat), sum(lon) / len(lon)
+
+
+def flatten(geojson: dict[str, Any]) -> FlatGeometry:
+    """
+    FeatureCollection / Feature / ジオメトリの全リングを 1 回の走査で平坦化する。
+
+    Polygon / MultiPolygon 以外のジオメトリはポリゴン 0 個の feature として扱う。
+    """
+    rings: list[list[list[float]]] = []
+    ring_sizes: list[int] = []
+    polygon_sizes: list[int] = []
+    feature_sizes: list[int] = []
+    for feature in _features(geojson):
+        geometry = feature.get("geometry") or {}
+        kind = geometry.get("type")
+        if kind == "Polygon":
+            polygons = (geometry["coordinates"],)
+        elif kind == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            polygons = ()
+        num_polygons = 0
+        for polygon in polygons:
+            polygon_rings = [ring for ring in polygon if ring]
+            if not polygon_rings:
+                continue
+            rings.extend(polygon_rings)
+            ring_sizes.extend(len(ring) for ring in polygon_rings)
+            polygon_sizes.append(len(polygon_rings))
+            num_polygons += 1
+        feature_sizes.append(num_polygons)
+
+    num_vertices = sum(ring_sizes)
+    points = itertools.chain.from_iterable(rings)
+    if rings and len(rings[0][0]) != 2:
+        points = (point[:2] for point in points)  # 高さ（Z）は捨てる
+    coords = np.fromiter(
+        itertools.chain.from_iterable(points), dtype=np.float64, count=2 * num_vertices
+    ).reshape(num_vertices, 2)
+    return FlatGeometry(
+        coords=coords,
+        ring_offsets=_offsets(ring_sizes),
+        polygon_offsets=_offsets(polygon_sizes),
+        feature_offsets=_offsets(feature_sizes),
+    )
+
+
+def _offsets(sizes: list[int]) -> np.ndarray:
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return offsets
+
+
+def simplify(flat: FlatGeometry, tolerance: float) -> FlatGeometry:
+    """
+    全ポリゴンをまとめて簡略化する（Douglas-Peucker、トポロジ保持）。
+
+    tolerance は座標と同じ単位（度）。feature の数と順序は変わらない。
+    """
+    geometries = shapely.from_ragged_array(
+        GeometryType.MULTIPOLYGON,
+        flat.coords,
+        (flat.ring_offsets, flat.polygon_offsets, flat.feature_offsets),
+    )
+    return _from_ragged(shapely.simplify(geometries, tolerance, preserve_topology=True))
+
+
+def from_shapely(geometries: np.ndarray) -> FlatGeometry | None:
+    """
+    shapely ジオメトリの配列を平坦化する。
+
+    Polygon / MultiPolygon 以外（欠損を含む）が混ざっていれば None を返す。
+    """
+    kinds = shapely.get_type_id(geometries)
+    if not np.isin(kinds, [GeometryType.POLYGON, GeometryType.MULTIPOLYGON]).all():
+        return None
+    return _from_ragged(geometries)
+
+
+def _from_ragged(geometries: np.ndarray) -> FlatGeometry:
+    kind, coords, offsets = shapely.to_ragged_array(geometries, include_z=False)
+    if kind == GeometryType.POLYGON:
+        # 全て Polygon なら feature ごとにポリゴン 1 つ
+        rings, polygons = offsets
+        features = np.arange(len(polygons))
+    else:
+        rings, polygons, features = offsets
+    ring_counts = np.diff(polygons)
+    if (ring_counts == 0).any():
+        # 空のポリゴン（リング 0 本）は flatten と同じく数えない
+        # （残すと from_ragged_array がプロセスごと落ちる）
+        kept = ring_counts > 0
+        features = np.concatenate([[0], np.cumsum(kept)])[features]
+        polygons = np.concatenate([[0], np.cumsum(ring_counts[kept])])
+    return FlatGeometry(
+        coords=coords,
+        ring_offsets=rings.astype(np.int64),
+        polygon_offsets=polygons.astype(np.int64),
+        feature_offsets=features.astype(np.int64),
+    )
+
+
+def polygon_records(
+    flat: FlatGeometry,
+    feature_properties: list[dict[str, Any] | None],
+    decimals: int = 6,
+) -> list[dict[str, Any]]:
+    """
+    PolygonLayer（position_format="XY"）にそのまま渡せるレコードを作る。
+
+    1 ポリゴン 1 レコードで、座標は入れ子にせずフラットな配列にする:
+    {"polygon": {"positions": [x0, y0, x1, y1, ...], "holeIndices": [...]},
+     "properties": {...}}
+    holeIndices は positions 上の各穴の開始位置。MultiPolygon の各部分は
+    同じ properties を持つ別レコードになる。
+    """
+    positions = np.round(flat.coords, decimals).ravel().tolist()
+    ring_starts = (flat.ring_offsets * 2).tolist()
+    polygon_offsets = flat.polygon_offsets.tolist()
+    records = []
+    for props, (first, last) in zip(
+        feature_properties, itertools.pairwise(flat.feature_offsets.tolist())
+    ):
+        for r0, r1 in itertools.pairwise(polygon_offsets[first : last + 1]):
+            start = ring_starts[r0]
+            polygon: dict[str, Any] = {"positions": positions[start : ring_starts[r1]]}
+            if r1 - r0 > 1:
+                polygon["holeIndices"] = [i - start for i in ring_starts[r0 + 1 : r1]]
+            records.append({"polygon": polygon, "properties": props})
+    return records
+
+
+def ring_areas(flat: FlatGeometry) -> tuple[np.ndarray, np.ndarray]:
+    """
+    リングごとの符号付き面積と重心モーメント（靴ひも公式、度単位）。
+
+    外周は正、穴は負に向きを揃える。
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (R,) の面積, (R, 2) の lon / lat モーメント
+    """
+    if flat.num_rings == 0:
+        return np.zeros(0), np.zeros((0, 2))
+    x = flat.coords[:, 0]
+    y = flat.coords[:, 1]
+    x_next = np.roll(x, -1)
+    y_next = np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    # リング末尾と次のリング先頭を結ぶ辺は数えない（閉じていないリングは閉じる）
+    starts = flat.ring_offsets[:-1]
+    ends = flat.ring_offsets[1:] - 1
+    cross[ends] = x[ends] * y[starts] - x[starts] * y[ends]
+    x_next[ends] = x[starts]
+    y_next[ends] = y[starts]
+
+    area = np.add.reduceat(cross, starts) / 2
+    moment = np.column_stack(
+        [
+            np.add.reduceat((x + x_next) * cross, starts) / 6,
+            np.add.reduceat((y + y_next) * cross, starts) / 6,
+        ]
+    )
+    target = np.full(flat.num_rings, -1.0)
+    target[flat.polygon_offsets[:-1]] = 1.0  # 各ポリゴンの最初のリング＝外周
+    flip = np.where(area * target < 0, -1.0, 1.0)
+    return area * flip, moment * flip[:, None]
+
+
+def summarize(geojson: dict[str, Any]) -> GeometrySummary:
+    """GeoJSON の bbox・中心・重心・頂点数を一度に求める。"""
+    return summarize_flat(flatten(geojson))
+
+
+def summarize_flat(flat: FlatGeometry) -> GeometrySummary:
+    """平坦化済みの座標から summarize と同じ集計を行う。"""
+    if flat.num_vertices == 0:
+        raise ValueError("ポリゴンが含まれていません")
+    min_lon, min_lat = flat.coords.min(axis=0)
+    max_lon, max_lat = flat.coords.max(axis=0)
+    center = (float(min_lat + max_lat) / 2, float(min_lon + max_lon) / 2)
+
+    area, moment = ring_areas(flat)
+    total = area.sum()
+    if total > 0:
+        cx, cy = moment.sum(axis=0) / total
+        centroid = (float(cy), float(cx))
+    else:
+        centroid = center  # 面積 0（退化したリングのみ）
+
+    return GeometrySummary(
+        bbox=(float(min_lon), float(min_lat), float(max_lon), float(max_lat)),
+        center=center,
+        centroid=centroid,
+        num_features=flat.num_features,
+        num_polygons=flat.num_polygons,
+        num_rings=flat.num_rings,
+        num_vertices=flat.num_vertices,
+    )
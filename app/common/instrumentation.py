@@ -0,0 +1,132 @@
+"""処理時間の計測（サイドバー表示と構造化ログ）
+
+APP_TIMINGS=1 のときだけ記録し、ログは 1 件 1 行の JSON で標準エラーへ出す
+（"timing {"name": ..., "ms": ..., "bytes": ...}"）。計測は入れ子にでき、名前は
+"step2/make_map/region_deck" のように外側からつながる。
+
+    @timed("step1")
+    def step1(): ...
+
+    with timed("region_deck") as t:
+        deck = region_deck(...)
+        t.payload_bytes = len(deck.to_json())
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("APP_TIMINGS", "") not in ("", "0")
+if ENABLED and not logger.handlers:
+    # Streamlit はアプリのロガーを設定しないので、自前のハンドラで標準エラーへ出す
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # ルートにもハンドラがあるときに二重に出さない
+HISTORY = 50  # セッションごとに保持する件数
+_SESSION_KEY = "_timings"
+
+_path: ContextVar[tuple[str, ...]] = ContextVar("timing_path", default=())
+
+
+@dataclass(slots=True)
+class Timing:
+    name: str
+    seconds: float = 0.0
+    payload_bytes: int | None = None
+
+
+class timed:
+    """
+    with 文でもデコレータでも使える計測。
+
+    デコレータでは size に戻り値からバイト数を求める関数を渡せる。
+    """
+
+    def __init__(self, name: str, size: Callable[[Any], int] | None = None) -> None:
+        self.name = name
+        self.size = size
+
+    def __enter__(self) -> Timing:
+        path = _path.get() + (self.name,)
+        self._token = _path.set(path)
+        self._timing = Timing("/".join(path))
+        self._start = time.perf_counter()
+        return self._timing
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._timing.seconds = time.perf_counter() - self._start
+        _path.reset(self._token)
+        if ENABLED:
+            _publish(self._timing)
+
+    def __call__[F: Callable[..., Any]](self, func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 呼び出しごとに別のインスタンスで計測する（再入・スレッド対策）
+            with timed(self.name) as timing:
+                result = func(*args, **kwargs)
+                if ENABLED and self.size is not None:
+                    timing.payload_bytes = self.size(result)
+            return result
+
+        return wrapper  # type: ignore
+
+
+def _publish(timing: Timing) -> None:
+    logger.info(
+        "timing %s",
+        json.dumps(
+            {
+                "name": timing.name,
+                "ms": round(timing.seconds * 1000, 3),
+                "bytes": timing.payload_bytes,
+            }
+        ),
+    )
+    # スクリプト実行中のスレッドならセッションにも残す（先読みスレッドはログのみ）
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        history = st.session_state.get(_SESSION_KEY)
+        if history is None:
+            history = st.session_state[_SESSION_KEY] = deque(maxlen=HISTORY)
+        history.append(timing)
+
+
+def timings_panel() -> None:
+    """直近の計測結果をサイドバーに表示する（無効なら何もしない）。"""
+    if not ENABLED:
+        return
+    with st.sidebar.expander("Timings", expanded=True):
+        history = st.session_state.get(_SESSION_KEY)
+        if not history:
+            st.caption("No timings yet.")
+            return
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "name": t.name,
+                        "ms": round(t.seconds * 1000, 1),
+                        "bytes": t.payload_bytes,
+                    }
+                    for t in reversed(history)
+                ]
+            ),
+            hide_index=True,
+        )
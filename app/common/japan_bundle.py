@@ -0,0 +1,222 @@
+"""日本の行政区域境界バンドル（numpy.memmap で読む）
+
+simplify-japan-geojson の都道府県界（"prefecture"）と市区町村界（"01"〜"47"）を
+平坦化し、座標とオフセットの .npy・レイヤごとの範囲を記した manifest.json・
+レイヤごとの properties にまとめる。
+
+読み込みは np.load(mmap_mode="r") なので、使うレイヤの範囲だけがコピーなしで
+ページキャッシュから読まれ、複数のワーカープロセスでも 1 つのコピーを共有する。
+
+作成（app/ から実行。取得は GeoJSON のディスクキャッシュを経由する）:
+
+    python -m common.japan_bundle build [--out DIR]
+
+既定の出力先は app/japan_bundle（JAPAN_BUNDLE_DIR で変更可）で、リポジトリの
+ルートから起動したアプリもそこを読む。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import UTC, datetime
+from typing import Any
+
+import numpy as np
+from common.geojson_loader import (
+    JAPAN_GEOJSON_BASE,
+    PREFECTURE_LAYER,
+    get_loader,
+    japan_geojson_url,
+)
+from common.geometry import FlatGeometry, flatten, properties
+
+# 保存先（変更可）。既定は app/japan_bundle で、作成時と実行時の作業ディレクトリに
+# よらず同じ場所を指す
+BUNDLE_DIR = os.environ.get(
+    "JAPAN_BUNDLE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "japan_bundle"),
+)
+BUNDLE_FORMAT = 1
+LAYERS = (PREFECTURE_LAYER, *(f"{i:02d}" for i in range(1, 48)))
+
+# manifest の各レイヤの範囲と .npy の対応
+_ARRAYS = {
+    "coords": "coords.npy",
+    "rings": "ring_offsets.npy",
+    "polygons": "polygon_offsets.npy",
+    "features": "feature_offsets.npy",
+}
+
+
+class JapanBundle:
+    """
+    build_bundle で作ったバンドル。
+
+    オフセットはレイヤ内の相対値で持つので、layer() はスライスを返すだけ。
+    properties は開いたときにすべて読んでおくので、build_bundle で
+    置き換えられた後も（memmap と同じく）古いデータを使い続けられる。
+    """
+
+    def __init__(self, path: str = BUNDLE_DIR) -> None:
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"未対応のバンドル形式です: {manifest.get('format')}")
+        self.version: str = manifest["version"]
+        self._layers: dict[str, dict[str, list[int]]] = manifest["layers"]
+        self._arrays = {
+            key: np.load(os.path.join(path, name), mmap_mode="r")
+            for key, name in _ARRAYS.items()
+        }
+        self._properties: dict[str, list[dict[str, Any] | None]] = {}
+        for code in self._layers:
+            with open(
+                os.path.join(path, "properties", f"{code}.json"), encoding="utf-8"
+            ) as f:
+                self._properties[code] = json.load(f)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._layers
+
+    def layer(self, code: str) -> FlatGeometry:
+        """code のレイヤの座標（読み取り専用の memmap スライス）。"""
+        ranges = self._layers[code]
+        arrays = {
+            key: self._arrays[key][start:stop] for key, (start, stop) in ranges.items()
+        }
+        return FlatGeometry(
+            coords=arrays["coords"],
+            ring_offsets=arrays["rings"],
+            polygon_offsets=arrays["polygons"],
+            feature_offsets=arrays["features"],
+        )
+
+    def properties(self, code: str) -> list[dict[str, Any] | None]:
+        """code のレイヤの feature ごとの properties。"""
+        return self._properties[code]
+
+
+# path -> (manifest.json の (inode, mtime), バンドル)
+_bundles: dict[str, tuple[tuple[int, int], JapanBundle]] = {}
+_bundles_lock = threading.Lock()
+
+
+def get_bundle(path: str = BUNDLE_DIR) -> JapanBundle | None:
+    """
+    プロセス全体で共有するバンドル（未作成なら None）。
+
+    呼ぶたびに manifest.json を stat し、build_bundle で作り直されていれば
+    開き直すので、起動後に作ったバンドルも再起動なしで使われる。
+    """
+    with _bundles_lock:
+        cached = _bundles.get(path)
+        try:
+            stat = os.stat(os.path.join(path, "manifest.json"))
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            bundle = JapanBundle(path)
+        except OSError:
+            # 未作成か、build_bundle が置き換えている最中（前のものを使う）
+            return cached[1] if cached is not None else None
+        _bundles[path] = (stamp, bundle)
+        return bundle
+
+
+def bundle_version(path: str = BUNDLE_DIR) -> str | None:
+    """
+    今のバンドルの version（未作成なら None）。
+
+    バンドルを使うものをキャッシュするときのキーに含めると、
+    作り直されたバンドルに切り替わる。
+    """
+    bundle = get_bundle(path)
+    return bundle.version if bundle is not None else None
+
+
+def build_bundle(out: str = BUNDLE_DIR, layers: tuple[str, ...] = LAYERS) -> str:
+    """
+    GeoJSON を取得してバンドルを作り、out を置き換える。
+
+    Returns:
+        str: バンドルの version（元データのハッシュ）
+    """
+    loader = get_loader()
+    parent = os.path.dirname(os.path.abspath(out))
+    os.makedirs(parent, exist_ok=True)
+    tmpdir = tempfile.mkdtemp(dir=parent, prefix=".japan_bundle-")
+    os.makedirs(os.path.join(tmpdir, "properties"))
+
+    digest = hashlib.sha256()
+    chunks: dict[str, list[np.ndarray]] = {key: [] for key in _ARRAYS}
+    sizes = dict.fromkeys(_ARRAYS, 0)
+    manifest_layers = {}
+    for code in layers:
+        geojson = loader.load(japan_geojson_url(code))
+        flat = flatten(geojson)
+        arrays = {
+            "coords": flat.coords,
+            "rings": flat.ring_offsets,
+            "polygons": flat.polygon_offsets,
+            "features": flat.feature_offsets,
+        }
+        ranges = {}
+        for key, array in arrays.items():
+            chunks[key].append(array)
+            ranges[key] = [sizes[key], sizes[key] + len(array)]
+            sizes[key] += len(array)
+            digest.update(np.ascontiguousarray(array).tobytes())
+        manifest_layers[code] = ranges
+
+        props = json.dumps(properties(geojson), ensure_ascii=False)
+        digest.update(props.encode("utf-8"))
+        with open(
+            os.path.join(tmpdir, "properties", f"{code}.json"), "w", encoding="utf-8"
+        ) as f:
+            f.write(props)
+        print(f"{code}: {flat.num_vertices} vertices", file=sys.stderr)
+
+    for key, name in _ARRAYS.items():
+        np.save(os.path.join(tmpdir, name), np.concatenate(chunks[key]))
+    version = digest.hexdigest()[:16]
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "built_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "source": JAPAN_GEOJSON_BASE,
+        "layers": manifest_layers,
+    }
+    with open(os.path.join(tmpdir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # 開いているバンドルは memmap（削除されても中身は残る）と読み込み済みの
+    # properties で古いデータを使い続け、次の get_bundle で新しいものに替わる
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    os.replace(tmpdir, out)
+    return version
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m common.japan_bundle",
+        description="日本の行政区域境界バンドルを作る",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="simplify-japan-geojson からバンドルを作る")
+    p_build.add_argument("--out", default=BUNDLE_DIR, help="出力先ディレクトリ")
+    args = parser.parse_args(argv)
+
+    version = build_bundle(args.out)
+    print(f"bundle {version} -> {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
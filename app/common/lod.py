@@ -0,0 +1,136 @@
+"""GeoJSON の詳細度（LOD）別キャッシュ"""
+
+import threading
+from functools import cached_property, lru_cache
+from typing import Any
+
+import numpy as np
+from common.geojson_loader import get_loader, japan_geojson_url
+from common.geometry import (
+    FlatGeometry,
+    GeometrySummary,
+    flatten,
+    polygon_records,
+    properties,
+    simplify,
+    summarize_flat,
+)
+from common.instrumentation import timed
+from common.japan_bundle import JapanBundle, get_bundle
+from common.spatial_index import RegionIndex
+
+# 簡略化の許容誤差（度）。0.001 度 ≒ 100 m
+LOD_TOLERANCES = (0.0002, 0.001, 0.005, 0.02)
+TILE_SIZE = 256  # Web メルカトルのタイル幅（ピクセル）
+
+
+def tolerance_for_zoom(zoom: float) -> float:
+    """
+    zoom で半ピクセルに収まる最大の許容誤差を選ぶ。
+
+    どの段階も粗すぎるとき（拡大時）は 0.0（元データ）を返す。
+    """
+    half_pixel = 360 / (TILE_SIZE * 2**zoom) / 2
+    return max((t for t in LOD_TOLERANCES if t <= half_pixel), default=0.0)
+
+
+class LevelsOfDetail:
+    """
+    1 つの境界データから作る許容誤差ごとの簡略版（作った段階は保持する）。
+
+    各段階は PolygonLayer 用のフラットなレコード（polygon_records）で持つ。
+    """
+
+    def __init__(
+        self, flat: FlatGeometry, feature_properties: list[dict[str, Any] | None]
+    ) -> None:
+        self._flat = flat
+        self._properties = feature_properties
+        # tolerance -> (レコード, レコードごとの feature 番号)
+        self._levels: dict[float, tuple[list[dict[str, Any]], np.ndarray]] = {}
+        self._lookups: dict[str, dict[Any, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.summary: GeometrySummary = summarize_flat(flat)
+
+    @classmethod
+    def from_geojson(cls, geojson: dict[str, Any]) -> "LevelsOfDetail":
+        return cls(flatten(geojson), properties(geojson))
+
+    def _level(self, tolerance: float) -> tuple[list[dict[str, Any]], np.ndarray]:
+        with self._lock:
+            if tolerance not in self._levels:
+                flat = simplify(self._flat, tolerance) if tolerance else self._flat
+                features = np.repeat(
+                    np.arange(flat.num_features), np.diff(flat.feature_offsets)
+                )
+                records = polygon_records(flat, self._properties)
+                self._levels[tolerance] = (records, features)
+            return self._levels[tolerance]
+
+    def get(self, tolerance: float) -> list[dict[str, Any]]:
+        """tolerance で簡略化したレコード（0.0 は元の解像度）。"""
+        return self._level(tolerance)[0]
+
+    def get_in_bbox(
+        self, tolerance: float, bbox: tuple[float, float, float, float]
+    ) -> list[dict[str, Any]]:
+        """get のうち bbox（min_lon, min_lat, max_lon, max_lat）と交わる feature だけ。"""
+        records, features = self._level(tolerance)
+        keep = np.isin(features, self.index.query_bbox(*bbox))
+        return [records[i] for i in np.flatnonzero(keep)]
+
+    def lookup(self, field: str, value: Any) -> dict[str, Any] | None:
+        """properties[field] が value の feature の properties（最初の 1 件）。"""
+        with self._lock:
+            if field not in self._lookups:
+                table: dict[Any, dict[str, Any]] = {}
+                for props in self._properties:
+                    if props and field in props:
+                        table.setdefault(props[field], props)
+                self._lookups[field] = table
+            return self._lookups[field].get(value)
+
+    @cached_property
+    def index(self) -> RegionIndex:
+        """元の解像度のポリゴンによる空間インデックス（初回アクセス時に作る）。"""
+        return RegionIndex(self._flat, self._properties)
+
+    @property
+    def nbytes(self) -> int:
+        """元の解像度の座標とオフセットのバイト数（計測用）。"""
+        return self._flat.nbytes
+
+    def for_zoom(self, zoom: float) -> list[dict[str, Any]]:
+        return self.get(tolerance_for_zoom(zoom))
+
+
+@lru_cache(maxsize=8)
+@timed("fetch", size=lambda lod: lod.nbytes)
+def levels_of_detail(url: str) -> LevelsOfDetail:
+    """url の GeoJSON の LOD（プロセス全体で共有）。"""
+    return LevelsOfDetail.from_geojson(get_loader().load(url))
+
+
+def bundled_levels_of_detail(code: str) -> LevelsOfDetail | None:
+    """境界バンドルにある code のレイヤの LOD（バンドルがなければ None）。"""
+    bundle = get_bundle()
+    if bundle is None or code not in bundle:
+        return None
+    return _bundle_levels_of_detail(bundle, code)
+
+
+@lru_cache(maxsize=8)
+@timed("bundle", size=lambda lod: lod.nbytes)
+def _bundle_levels_of_detail(bundle: JapanBundle, code: str) -> LevelsOfDetail:
+    """bundle ごとにキャッシュする（作り直されたバンドルは別のキーになる）。"""
+    return LevelsOfDetail(bundle.layer(code), bundle.properties(code))
+
+
+def japan_levels_of_detail(code: str) -> LevelsOfDetail:
+    """
+    日本の境界データの LOD。
+
+    code は "prefecture" か都道府県コード 2 桁。境界バンドルがあればそこから、
+    なければ simplify-japan-geojson を取得して作る。
+    """
+    return bundled_levels_of_detail(code) or levels_of_detail(japan_geojson_url(code))
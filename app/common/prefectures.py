@@ -0,0 +1,202 @@
+"""都道府県マスタ
+
+都道府県・県庁所在地・代表位置の共有テーブル。都道府県コード（JIS X 0401）は
+PREFECTURES の並び順 + 1。
+"""
+
+import pandas as pd
+
+# 都道府県・県庁所在地・緯度経度（代表位置）
+# 並びは JIS 都道府県コード順（北海道 = 1 … 沖縄県 = 47）
+PREFECTURES = (
+    ("北海道", "札幌市", 43.06417, 141.34694),
+    ("青森県", "青森市", 40.82444, 140.74),
+    ("岩手県", "盛岡市", 39.70361, 141.1525),
+    ("宮城県", "仙台市", 38.26889, 140.87194),
+    ("秋田県", "秋田市", 39.71861, 140.1025),
+    ("山形県", "山形市", 38.24056, 140.36333),
+    ("福島県", "福島市", 37.75, 140.46778),
+    ("茨城県", "水戸市", 36.365, 140.47144),
+    ("栃木県", "宇都宮市", 36.5551, 139.8828),
+    ("群馬県", "前橋市", 36.39111, 139.06083),
+    ("埼玉県", "さいたま市", 35.86166, 139.6455),
+    ("千葉県", "千葉市", 35.60472, 140.12333),
+    ("東京都", "新宿区", 35.69384, 139.70361),
+    ("神奈川県", "横浜市", 35.4437, 139.638),
+    ("新潟県", "新潟市", 37.91667, 139.03639),
+    ("富山県", "富山市", 36.69528, 137.21139),
+    ("石川県", "金沢市", 36.56111, 136.65622),
+    ("福井県", "福井市", 36.06528, 136.22194),
+    ("山梨県", "甲府市", 35.66444, 138.56833),
+    ("長野県", "長野市", 36.65139, 138.18111),
+    ("岐阜県", "岐阜市", 35.42333, 136.76056),
+    ("静岡県", "静岡市", 34.97556, 138.38278),
+    ("愛知県", "名古屋市", 35.18144, 136.9064),
+    ("三重県", "津市", 34.72943, 136.5086),
+    ("滋賀県", "大津市", 35.00444, 135.86833),
+    ("京都府", "京都市", 35.02139, 135.75556),
+    ("大阪府", "大阪市", 34.69374, 135.50218),
+    ("兵庫県", "神戸市", 34.69139, 135.18306),
+    ("奈良県", "奈良市", 34.68528, 135.80472),
+    ("和歌山県", "和歌山市", 34.22583, 135.1675),
+    ("鳥取県", "鳥取市", 35.50111, 134.235),
+    ("島根県", "松江市", 35.46806, 133.05056),
+    ("岡山県", "岡山市", 34.66167, 133.935),
+    ("広島県", "広島市", 34.39639, 132.45944),
+    ("山口県", "山口市", 34.18583, 131.47139),
+    ("徳島県", "徳島市", 34.07028, 134.55444),
+    ("香川県", "高松市", 34.34278, 134.04639),
+    ("愛媛県", "松山市", 33.83944, 132.76556),
+    ("高知県", "高知市", 33.55972, 133.53111),
+    ("福岡県", "福岡市", 33.60639, 130.41806),
+    ("佐賀県", "佐賀市", 33.24944, 130.29889),
+    ("長崎県", "長崎市", 32.75028, 129.87778),
+    ("熊本県", "熊本市", 32.80306, 130.70778),
+    ("大分県", "大分市", 33.23806, 131.6125),
+    ("宮崎県", "宮崎市", 31.91111, 131.42389),
+    ("鹿児島県", "鹿児島市", 31.59306, 130.55778),
+    ("沖縄県", "那覇市", 26.2125, 127.68111),
+)
+
+# 都道府県名 → コード（1-47）
+CODE_BY_PREF = {p: i for i, (p, _c, _la, _lo) in enumerate(PREFECTURES, start=1)}
+
+# 都道府県名（接尾辞なし）の読み（ひらがな）とローマ字表記の揺れ
+READINGS = (
+    ("ほっかい", ("hokkai",)),
+    ("あおもり", ("aomori",)),
+    ("いわて", ("iwate",)),
+    ("みやぎ", ("miyagi",)),
+    ("あきた", ("akita",)),
+    ("やまがた", ("yamagata",)),
+    ("ふくしま", ("fukushima",)),
+    ("いばらき", ("ibaraki",)),
+    ("とちぎ", ("tochigi",)),
+    ("ぐんま", ("gunma", "gumma")),
+    ("さいたま", ("saitama",)),
+    ("ちば", ("chiba",)),
+    ("とうきょう", ("tokyo", "toukyou")),
+    ("かながわ", ("kanagawa",)),
+    ("にいがた", ("niigata",)),
+    ("とやま", ("toyama",)),
+    ("いしかわ", ("ishikawa",)),
+    ("ふくい", ("fukui",)),
+    ("やまなし", ("yamanashi",)),
+    ("ながの", ("nagano",)),
+    ("ぎふ", ("gifu",)),
+    ("しずおか", ("shizuoka",)),
+    ("あいち", ("aichi",)),
+    ("みえ", ("mie",)),
+    ("しが", ("shiga",)),
+    ("きょうと", ("kyoto", "kyouto")),
+    ("おおさか", ("osaka", "oosaka")),
+    ("ひょうご", ("hyogo", "hyougo")),
+    ("なら", ("nara",)),
+    ("わかやま", ("wakayama",)),
+    ("とっとり", ("tottori",)),
+    ("しまね", ("shimane",)),
+    ("おかやま", ("okayama",)),
+    ("ひろしま", ("hiroshima",)),
+    ("やまぐち", ("yamaguchi",)),
+    ("とくしま", ("tokushima",)),
+    ("かがわ", ("kagawa",)),
+    ("えひめ", ("ehime",)),
+    ("こうち", ("kochi", "kouchi")),
+    ("ふくおか", ("fukuoka",)),
+    ("さが", ("saga",)),
+    ("ながさき", ("nagasaki",)),
+    ("くまもと", ("kumamoto",)),
+    ("おおいた", ("oita", "ooita")),
+    ("みやざき", ("miyazaki",)),
+    ("かごしま", ("kagoshima",)),
+    ("おきなわ", ("okinawa",)),
+)
+SUFFIX_READINGS = {
+    "県": ("けん", ("ken",)),
+    "都": ("と", ("to",)),
+    "府": ("ふ", ("fu",)),
+    "道": ("どう", ("do", "dou")),
+}
+
+
+# ---- 表記の正規化 ----
+def _build_normalize_table() -> dict[int, int | None]:
+    table: dict[int, int | None] = {}
+    # 全角英数記号 → 半角、英大文字 → 小文字
+    for c in range(0xFF01, 0xFF5F):
+        table[c] = c - 0xFEE0
+    for c in range(ord("A"), ord("Z") + 1):
+        table[c] = c + 0x20
+        table[c + 0xFEE0] = c + 0x20
+    # カタカナ → ひらがな
+    for c in range(0x30A1, 0x30F7):
+        table[c] = c - 0x60
+    # 長音記号付きローマ字 → 記号なし
+    for src, dst in zip("āīūēōâîûêôĀĪŪĒŌÂÎÛÊÔ", "aiueoaiueoaiueoaiueo"):
+        table[ord(src)] = ord(dst)
+    # 空白・区切り記号は削除
+    for c in " \u3000\t-‐－・.．'’":
+        table[ord(c)] = None
+    return table
+
+
+NORMALIZE_TABLE = _build_normalize_table()
+
+
+def normalize_name(name: str | None) -> str:
+    """全角・半角、大文字・小文字、カタカナ・ひらがな、空白の違いをならす。"""
+    if name is None:
+        return ""
+    return name.translate(NORMALIZE_TABLE)
+
+
+def _build_answer_index() -> dict[str, int]:
+    index: dict[str, int] = {}
+    for code, ((pref, _cap, _lat, _lon), (kana, romaji)) in enumerate(
+        zip(PREFECTURES, READINGS), start=1
+    ):
+        base, suffix = pref[:-1], pref[-1]
+        suffix_kana, suffix_romaji = SUFFIX_READINGS[suffix]
+        spellings = [pref, base, kana + suffix_kana, *romaji]
+        spellings += [r + s for r in romaji for s in suffix_romaji]
+        if suffix != "道":  # 「ほっかい」だけでは北海道と読みにくいので除く
+            spellings.append(kana)
+        for spelling in spellings:
+            index[normalize_name(spelling)] = code
+    return index
+
+
+# 受け付ける表記（正規化済み）→ 都道府県コード
+ANSWER_INDEX = _build_answer_index()
+
+
+def lookup_prefecture(text: str | None) -> int | None:
+    """入力された都道府県名（漢字・かな・ローマ字）から都道府県コードを引く。"""
+    return ANSWER_INDEX.get(normalize_name(text))
+
+
+# 地方区分（8 地方）と、都道府県コード順の地方番号
+REGIONS = ("北海道", "東北", "関東", "中部", "近畿", "中国", "四国", "九州・沖縄")
+REGION_BY_CODE = (
+    (0,)
+    + (1,) * 6  # 青森〜福島
+    + (2,) * 7  # 茨城〜神奈川
+    + (3,) * 9  # 新潟〜愛知
+    + (4,) * 7  # 三重〜和歌山
+    + (5,) * 5  # 鳥取〜山口
+    + (6,) * 4  # 徳島〜高知
+    + (7,) * 8  # 福岡〜沖縄
+)
+
+
+def prefecture(code: int) -> tuple[str, str, float, float]:
+    """都道府県コードから (都道府県, 県庁所在地, lat, lon) を引く。"""
+    return PREFECTURES[code - 1]
+
+
+# 都道府県コードを index にした列指向のテーブル
+PREFECTURE_FRAME = pd.DataFrame(
+    PREFECTURES,
+    columns=["pref", "cap", "lat", "lon"],
+    index=pd.RangeIndex(1, len(PREFECTURES) + 1, name="code"),
+)
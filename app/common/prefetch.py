@@ -0,0 +1,72 @@
+"""バックグラウンドの先読み（スレッドプール）"""
+
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import cache
+from threading import Lock
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 2
+MAX_PENDING = 4  # 実行待ちの上限（あふれたら古いものから取り消す）
+
+
+class Prefetcher:
+    """
+    キーごとに 1 つだけ先読みを走らせるスレッドプール。
+
+    結果は共有キャッシュに残す前提で、ここでは保持しない。
+    実行待ちが MAX_PENDING を超えると古い順に取り消すので、
+    選択を素早く切り替えても仕事がたまらない。
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="prefetch")
+        self._futures: OrderedDict[str, Future] = OrderedDict()
+        self._lock = Lock()
+        self.max_pending = max_pending
+
+    def submit(self, key: str, fn: Callable[..., Any], *args: Any) -> Future:
+        """key の先読みを始める（実行待ち・実行中なら既存の Future を返す）。"""
+        with self._lock:
+            for k in [k for k, f in self._futures.items() if f.done()]:
+                del self._futures[k]
+            if key in self._futures:
+                return self._futures[key]
+
+            queued = [k for k, f in self._futures.items() if not f.running()]
+            for k in queued[: max(0, len(queued) - self.max_pending + 1)]:
+                self._futures.pop(k).cancel()
+
+            future = self._executor.submit(fn, *args)
+            future.add_done_callback(_log_failure)
+            self._futures[key] = future
+            return future
+
+    def cancel(self, key: str) -> None:
+        """key の先読みを取り消す（実行中のものは最後まで走らせる）。"""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and future.cancel():
+                del self._futures[key]
+
+    def wait(self, key: str, timeout: float | None = None) -> None:
+        """key の先読みが実行中なら終わるまで待つ（失敗は無視する）。"""
+        with self._lock:
+            future = self._futures.get(key)
+        if future is not None:
+            wait([future], timeout=timeout)
+
+
+def _log_failure(future: Future) -> None:
+    if not future.cancelled() and (e := future.exception()) is not None:
+        logger.warning("prefetch failed: %s", e)
+
+
+@cache
+def get_prefetcher() -> Prefetcher:
+    """プロセス全体で共有する先読みプール。"""
+    return Prefetcher()
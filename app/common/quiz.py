@@ -0,0 +1,128 @@
+"""都道府県クイズの出題・回答データ"""
+
+import bisect
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from common.prefectures import PREFECTURES, REGION_BY_CODE
+
+NUM_OPTIONS = 4  # 4択
+PRIOR_STRENGTH = 5.0  # 地方の誤答率に寄せる強さ（仮想的な試行回数）
+MIN_WEIGHT = 0.05  # 得意な都道府県にも残す最低限の出題重み
+
+# 都道府県コードの配列（読み取り専用で共有）
+CODES = np.arange(1, len(PREFECTURES) + 1)
+CODES.flags.writeable = False
+
+
+def error_weights(frame: pd.DataFrame) -> np.ndarray:
+    """
+    累積統計から都道府県ごとの出題重み（推定誤答率）を作る。
+
+    試行回数の少ない都道府県は同じ地方の誤答率に寄せて推定する。
+
+    Args:
+        frame: index = 都道府県コード, columns = attempts / corrects
+
+    Returns:
+        np.ndarray: 都道府県コード順の重み
+    """
+    attempts = frame["attempts"].to_numpy(dtype=float)
+    wrongs = attempts - frame["corrects"].to_numpy(dtype=float)
+    region = np.asarray(REGION_BY_CODE)
+    region_attempts = np.bincount(region, weights=attempts)
+    region_wrongs = np.bincount(region, weights=wrongs)
+    region_rate = (region_wrongs + 1) / (region_attempts + 2)
+    rate = (wrongs + PRIOR_STRENGTH * region_rate[region]) / (attempts + PRIOR_STRENGTH)
+    return np.maximum(rate, MIN_WEIGHT)
+
+
+class WeightedSampler:
+    """累積重みの二分探索による重み付き非復元抽出（1 回の出題は O(k log n)）。"""
+
+    def __init__(self, weights) -> None:
+        self._cumulative = list(itertools.accumulate(float(w) for w in weights))
+        self._total = self._cumulative[-1]
+
+    def sample(self, k: int, rng: np.random.Generator) -> list[int]:
+        """都道府県コードを k 個（重複なし）選ぶ。"""
+        n = len(self._cumulative)
+        chosen: list[int] = []
+        seen: set[int] = set()
+        while len(chosen) < k:
+            i = bisect.bisect_right(self._cumulative, rng.random() * self._total)
+            i = min(i, n - 1)
+            if i not in seen:
+                seen.add(i)
+                chosen.append(i + 1)
+        return chosen
+
+
+def draw_quiz(
+    k: int, rng: np.random.Generator, sampler: WeightedSampler | None = None
+) -> list[int]:
+    """出題する都道府県コードを k 個（重複なし）選ぶ。sampler がなければ一様。"""
+    if sampler is None:
+        return rng.choice(CODES, size=k, replace=False).tolist()
+    return sampler.sample(k, rng)
+
+
+def draw_options(
+    codes: list[int], rng: np.random.Generator, n_options: int = NUM_OPTIONS
+) -> np.ndarray:
+    """
+    各問の選択肢（正解 + 誤答）を都道府県コードでまとめて作る。
+
+    誤答は正解からのずらし幅 1..46 を棄却サンプリングで重複なく引くので、
+    正解と重なることはない。
+
+    Returns:
+        np.ndarray: shape (len(codes), n_options)。正解の位置はランダム。
+    """
+    n = len(CODES)
+    answers = np.asarray(codes, dtype=np.intp)
+    offsets = rng.integers(1, n, size=(len(answers), n_options - 1))
+    while True:
+        srt = np.sort(offsets, axis=1)
+        dup = (srt[:, 1:] == srt[:, :-1]).any(axis=1)
+        if not dup.any():
+            break
+        offsets[dup] = rng.integers(1, n, size=(int(dup.sum()), n_options - 1))
+    wrongs = (answers[:, None] - 1 + offsets) % n + 1
+    return rng.permuted(np.column_stack([wrongs, answers]), axis=1)
+
+
+@dataclass(frozen=True, slots=True)
+class Answer:
+    """
+    1 問分の回答。
+
+    都道府県名・県庁所在地・位置は共有テーブル PREFECTURES から引くので、
+    セッションには都道府県コードと回答・正誤だけを持つ。
+    """
+
+    code: int  # 都道府県コード (1-47)
+    user_answer: str
+    is_correct: bool
+
+    @property
+    def pref(self) -> str:
+        return PREFECTURES[self.code - 1][0]
+
+    @property
+    def cap(self) -> str:
+        return PREFECTURES[self.code - 1][1]
+
+    @property
+    def lat(self) -> float:
+        return PREFECTURES[self.code - 1][2]
+
+    @property
+    def lon(self) -> float:
+        return PREFECTURES[self.code - 1][3]
+
+    def correct_answer(self, mode: str) -> str:
+        """出題モードに応じた正解（県庁所在地 or 都道府県名）。"""
+        return self.cap if mode == "pref_to_capital_mc" else self.pref
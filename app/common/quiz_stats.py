@@ -0,0 +1,519 @@
+"""都道府県クイズの累積統計ストア
+
+stats.json（スナップショット）に全セッションの集計を保持し、ゲーム終了ごとの
+差分は stats.json.log に 1 行 1 セッションで追記する。
+追記・圧縮はロックファイルで排他するため、同時に終了したプレイヤーの
+加算が失われない。読み込み側はログの未読部分だけを取り込んで
+メモリ上の集計を返す。ファイルの (inode, mtime, size) が前回と同じなら
+ディスクには触れない。
+
+複数レプリカの回答ログは CLI でまとめて取り込める（app/ から実行）:
+
+    python -m common.quiz_stats ingest answers.ndjson [more.ndjson.gz ...]
+    cat answers.ndjson | python -m common.quiz_stats ingest -
+
+既定の統計ファイルは作業ディレクトリによらずリポジトリ直下の stats.json。
+
+global_stats format (per-pref keyed by prefecture name):
+{
+    "<都道府県>": {"pref": "<>", "cap": "<>", "lat": <>, "lon": <>, "attempts": n, "corrects": m}
+}
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from common.prefectures import CODE_BY_PREF, PREFECTURE_FRAME, PREFECTURES
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+# 保存先（変更可）。既定はリポジトリ直下の stats.json で、ルートから起動した
+# アプリと app/ から実行する CLI が同じファイルを使う
+STATS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "stats.json",
+)
+COMPACT_LOG_BYTES = 256 * 1024  # ログがこのサイズを超えたらスナップショットへ圧縮
+# スナップショット内で、取り込み済みのログ（inode と位置）を記録するキー
+_LOG_KEY = "_log"
+
+
+# ---- ファイル I/O ----
+def load_global_stats(path: str = STATS_FILE) -> dict[str, Any]:
+    """stats.json を読み込んで dict を返す。ファイルがなければ空の dict。"""
+    return _load_snapshot(path)[0]
+
+
+def _load_snapshot(path: str) -> tuple[dict[str, Any], dict[str, int] | None]:
+    """スナップショットと、それが取り込み済みのログ {"inode", "offset"}。"""
+    if not os.path.exists(path):
+        return {}, None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return {}, None
+    if not isinstance(data, dict):
+        return {}, None
+    covered = data.pop(_LOG_KEY, None)
+    return data, covered if isinstance(covered, dict) else None
+
+
+def atomic_write_json(path: str, data: dict[str, Any]):
+    """一時ファイルに書いてから os.replace で原子上書き（簡易実装）。"""
+    dirpath = os.path.dirname(os.path.abspath(path)) or "."
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=dirpath, delete=False
+    ) as tmp:
+        json.dump(data, tmp, ensure_ascii=False, indent=2)
+        tmp_name = tmp.name
+    os.replace(tmp_name, path)
+
+
+def save_global_stats(stats: dict[str, Any], path: str = STATS_FILE):
+    """global 統計をスナップショットとして丸ごと保存。"""
+    atomic_write_json(path, stats)
+
+
+# ---- 集計 ----
+def session_delta(session_answered) -> dict[str, Any]:
+    """
+    セッションの回答から都道府県ごとの差分（attempts / corrects）を作る。
+
+    session_answered: list of Answer (or None for unanswered questions)
+    """
+    delta: dict[str, Any] = {}
+    for answer in session_answered:
+        if not answer:
+            continue
+        pref, cap, lat, lon = PREFECTURES[answer.code - 1]
+        rec = delta.setdefault(
+            pref,
+            {
+                "pref": pref,
+                "cap": cap,
+                "lat": lat,
+                "lon": lon,
+                "attempts": 0,
+                "corrects": 0,
+            },
+        )
+        rec["attempts"] += 1
+        rec["corrects"] += 1 if answer.is_correct else 0
+    return delta
+
+
+def merge_stats(global_stats: dict[str, Any], delta: dict[str, Any]) -> None:
+    """差分 delta を global_stats に加算する（in place）。"""
+    for key, d in delta.items():
+        rec = global_stats.get(key)
+        if rec is None:
+            global_stats[key] = dict(d)
+            continue
+        rec["attempts"] = rec.get("attempts", 0) + d.get("attempts", 0)
+        rec["corrects"] = rec.get("corrects", 0) + d.get("corrects", 0)
+        # keep lat/lon/cap consistent if missing
+        for k in ("pref", "cap", "lat", "lon"):
+            if k in d:
+                rec.setdefault(k, d[k])
+
+
+# ---- 列指向の集計（index = 都道府県コード, columns = attempts / corrects） ----
+TABLE_COLUMNS = {
+    "pref": "都道府県",
+    "cap": "県庁所在地",
+    "attempts": "試行回数",
+    "corrects": "正解数",
+    "rate": "正答率",
+}
+
+
+def rollup(codes, is_correct) -> pd.DataFrame:
+    """都道府県コード列と正誤列から attempts / corrects を集計する。"""
+    codes = np.asarray(codes, dtype=np.intp)
+    correct = np.asarray(is_correct, dtype=bool)
+    n = len(PREFECTURE_FRAME) + 1
+    return pd.DataFrame(
+        {
+            "attempts": np.bincount(codes, minlength=n)[1:n],
+            "corrects": np.bincount(codes[correct], minlength=n)[1:n],
+        },
+        index=PREFECTURE_FRAME.index,
+    )
+
+
+def session_frame(session_answered) -> pd.DataFrame:
+    """セッションの回答を列指向の集計にする。"""
+    answers = [a for a in session_answered if a]
+    return rollup([a.code for a in answers], [a.is_correct for a in answers])
+
+
+def stats_frame(global_stats: dict[str, Any]) -> pd.DataFrame:
+    """dict 形式の累積統計を列指向の集計にする（未知の都道府県名は無視）。"""
+    df = pd.DataFrame.from_dict(global_stats, orient="index")
+    df = df.reindex(columns=["attempts", "corrects"], fill_value=0)
+    codes = df.index.map(CODE_BY_PREF)
+    totals = df.loc[codes.notna()].groupby(codes.dropna().astype(int)).sum()
+    return totals.reindex(PREFECTURE_FRAME.index, fill_value=0).astype(np.int64)
+
+
+def accuracy_table(frame: pd.DataFrame) -> pd.DataFrame:
+    """都道府県ごとの正答率テーブル（出題されたものだけ、正答率の低い順）。"""
+    played = frame[frame["attempts"] > 0]
+    table = PREFECTURE_FRAME.loc[played.index].assign(
+        attempts=played["attempts"],
+        corrects=played["corrects"],
+        rate=(played["corrects"] / played["attempts"]).round(3),
+    )
+    return table.rename(columns=TABLE_COLUMNS).sort_values("正答率", kind="stable")
+
+
+def heatmap_data(frame: pd.DataFrame) -> pd.DataFrame:
+    """間違いヒートマップ用データ（weight = 間違い回数）。"""
+    wrongs = frame["attempts"] - frame["corrects"]
+    wrong = wrongs > 0
+    return PREFECTURE_FRAME.loc[wrong, ["lat", "lon", "cap", "pref"]].assign(
+        weight=wrongs[wrong]
+    )
+
+
+def frame_delta(frame: pd.DataFrame) -> dict[str, Any]:
+    """列指向の集計を StatsStore.append に渡せる差分 dict にする。"""
+    played = frame[frame["attempts"] > 0]
+    records = PREFECTURE_FRAME.loc[played.index].assign(
+        attempts=played["attempts"], corrects=played["corrects"]
+    )
+    return {
+        rec["pref"]: rec
+        for rec in records.astype(object).to_dict(orient="records")  # int64 → int
+    }
+
+
+# ---- ロック ----
+@contextmanager
+def _locked(lock_path: str, shared: bool = False) -> Iterator[None]:
+    """ロックファイルで排他する（Windows では常に排他ロック）。"""
+    with open(lock_path, "a+b") as f:
+        if sys.platform == "win32":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _replace_with_empty(path: str) -> None:
+    """path を空のファイルに原子的に置き換える。"""
+    dirpath = os.path.dirname(os.path.abspath(path)) or "."
+    fd, tmp_name = tempfile.mkstemp(dir=dirpath, prefix=".stats-log-")
+    os.close(fd)
+    os.replace(tmp_name, path)
+
+
+def _file_key(path: str) -> tuple[int, int, int] | None:
+    """ファイルの同一性判定用キー (inode, mtime_ns, size)。"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class StatsStore:
+    """
+    追記型の累積統計ストア。
+
+    - append: セッション差分をログへ 1 行追記し、メモリ上の集計にも反映する（O(セッション)）
+    - aggregate: スナップショット + ログの未読部分をメモリ上の集計へ反映して返す
+    - save: 集計全体をスナップショットとして書き出し、ログを空にする
+    - compact: ログをスナップショットへ畳み込み、ログを空にする
+    - frame: 集計を列指向の DataFrame で返す（version ごとに 1 回だけ変換）
+
+    プロセス内で共有して使う想定（version は集計が変わるたびに増える）。
+    """
+
+    def __init__(
+        self, path: str = STATS_FILE, compact_log_bytes: int = COMPACT_LOG_BYTES
+    ) -> None:
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.lock_path = f"{path}.lock"
+        self.compact_log_bytes = compact_log_bytes
+        self._stats: dict[str, Any] = {}
+        self._snapshot_key: tuple[int, int, int] | None = None
+        self._log_key: tuple[int, int, int] | None = None
+        self._log_offset = 0
+        self.version = 0
+        self._frame: pd.DataFrame | None = None
+        self._frame_version = -1
+        # 同一プロセス内のスレッド（セッション）間でメモリ上の集計を守る
+        self._mutex = threading.Lock()
+
+    def append(self, delta: dict[str, Any]) -> None:
+        """セッション差分をログに追記。ログが大きくなっていれば圧縮する。"""
+        if not delta:
+            return
+        line = json.dumps(delta, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._mutex, _locked(self.lock_path):
+            # 追記位置までメモリを追いつかせてから、自分の差分はそのまま加算する
+            self._refresh_locked()
+            with open(self.log_path, "a+b") as f:
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        # 異常終了したプロセスの書きかけの行を閉じる
+                        # （そのまま続けると追記した行まで読めなくなる）
+                        f.write(b"\n")
+                f.write(line.encode("utf-8"))
+                self._log_offset = f.tell()
+            self._log_key = _file_key(self.log_path)
+            merge_stats(self._stats, delta)
+            self.version += 1
+            if self._log_offset >= self.compact_log_bytes:
+                self._compact_locked()
+
+    def aggregate(self) -> dict[str, Any]:
+        """最新の累積統計（コピー）を返す。"""
+        with self._mutex:
+            if not self._is_fresh():
+                with _locked(self.lock_path, shared=True):
+                    self._refresh_locked()
+            return {k: dict(v) for k, v in self._stats.items()}
+
+    def frame(self) -> pd.DataFrame:
+        """最新の累積統計を列指向で返す（共有オブジェクトなので変更しないこと）。"""
+        with self._mutex:
+            if not self._is_fresh():
+                with _locked(self.lock_path, shared=True):
+                    self._refresh_locked()
+            if self._frame is None or self._frame_version != self.version:
+                self._frame = stats_frame(self._stats)
+                self._frame_version = self.version
+            return self._frame
+
+    def save(self, stats: dict[str, Any]) -> None:
+        """集計全体をスナップショットとして保存し、メモリ上の集計も置き換える。"""
+        with self._mutex, _locked(self.lock_path):
+            self._stats = {k: dict(v) for k, v in stats.items()}
+            self._write_snapshot_locked()
+            self.version += 1
+
+    def compact(self) -> None:
+        """ログをスナップショットへ畳み込む。"""
+        with self._mutex, _locked(self.lock_path):
+            self._compact_locked()
+
+    def _is_fresh(self) -> bool:
+        """前回読んだときからスナップショットもログも変わっていないか。"""
+        return (
+            self.version > 0
+            and _file_key(self.path) == self._snapshot_key
+            and _file_key(self.log_path) == self._log_key
+        )
+
+    def _refresh_locked(self) -> None:
+        key = _file_key(self.path)
+        if key != self._snapshot_key or self.version == 0:
+            # 他プロセスが圧縮・保存した（または初回）→ スナップショットから読み直す
+            self._reload_snapshot_locked()
+        self._read_log_locked()
+
+    def _reload_snapshot_locked(self) -> None:
+        self._stats, covered = _load_snapshot(self.path)
+        self._snapshot_key = _file_key(self.path)
+        self._log_offset = 0
+        log_key = _file_key(self.log_path)
+        if covered and log_key and covered.get("inode") == log_key[0]:
+            # スナップショットを書いた後、ログを置き換える前に落ちた
+            # → 取り込み済みの行を読み飛ばす
+            self._log_offset = min(int(covered.get("offset", 0)), log_key[2])
+        self.version += 1
+
+    def _read_log_locked(self) -> None:
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            self._log_key = None
+            self._log_offset = 0
+            return
+        with f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < self._log_offset:
+                # ログが切り詰められた → 全体を読み直す
+                self._reload_snapshot_locked()
+            f.seek(self._log_offset)
+            chunk = f.read()
+        self._log_key = _file_key(self.log_path)
+        # 書き込み途中の行は次回に回す
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return
+        for raw in chunk[:end].splitlines():
+            try:
+                delta = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(delta, dict):
+                merge_stats(self._stats, delta)
+        self._log_offset += end
+        self.version += 1
+
+    def _compact_locked(self) -> None:
+        self._refresh_locked()
+        self._write_snapshot_locked()
+
+    def _write_snapshot_locked(self) -> None:
+        # ログは切り詰めずに空のファイルへ置き換える（inode が変わる）。
+        # スナップショットに今のログの inode とサイズを書いておくので、
+        # 2 つの操作の間で落ちても次の読み込みで同じ行を二重に数えない
+        log_key = _file_key(self.log_path)
+        snapshot: dict[str, Any] = dict(self._stats)
+        if log_key is not None:
+            snapshot[_LOG_KEY] = {"inode": log_key[0], "offset": log_key[2]}
+        save_global_stats(snapshot, self.path)
+        _replace_with_empty(self.log_path)
+        self._snapshot_key = _file_key(self.path)
+        self._log_key = _file_key(self.log_path)
+        self._log_offset = 0
+
+
+# ---- 回答ログの一括取り込み ----
+INGEST_CHUNK_SIZE = 1_000_000  # 1 チャンクあたりの回答数（メモリ使用量の上限）
+
+
+def _open_log(path: str):
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_answer_chunks(
+    lines: Iterable[bytes | str], chunk_size: int = INGEST_CHUNK_SIZE
+) -> Iterator[tuple[np.ndarray, np.ndarray, int]]:
+    """
+    NDJSON の回答レコードを (codes, is_correct, skipped) のチャンクにまとめる。
+
+    1 行 1 回答で、都道府県は "code"（1-47）か "pref"（都道府県名）で指定する:
+        {"code": 13, "is_correct": true}
+        {"pref": "東京都", "is_correct": false}
+
+    返す配列はチャンクごとに使い回すので、次のチャンクを読む前に集計すること。
+    """
+    n_pref = len(PREFECTURES)
+    codes = np.empty(chunk_size, dtype=np.intp)
+    correct = np.empty(chunk_size, dtype=bool)
+    n = skipped = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+            code = rec.get("code") or CODE_BY_PREF.get(rec.get("pref"))
+        except ValueError, AttributeError, TypeError:
+            code = None  # 壊れた行・dict でない行・ハッシュできない "pref"
+        # bool は int のサブクラスなので true が 1（北海道）にならないよう除く
+        if (
+            isinstance(code, bool)
+            or not isinstance(code, int)
+            or not 1 <= code <= n_pref
+        ):
+            skipped += 1
+            continue
+        codes[n] = code
+        correct[n] = bool(rec.get("is_correct"))
+        n += 1
+        if n == chunk_size:
+            yield codes, correct, skipped
+            n = skipped = 0
+    if n or skipped:
+        yield codes[:n], correct[:n], skipped
+
+
+def ingest(
+    paths: Iterable[str], chunk_size: int = INGEST_CHUNK_SIZE
+) -> tuple[pd.DataFrame, int]:
+    """回答ログをチャンクごとに集計し、(集計, 読み飛ばした行数) を返す。"""
+    total = rollup([], [])
+    skipped = 0
+    for path in paths:
+        f = _open_log(path)
+        try:
+            for codes, correct, n_skipped in iter_answer_chunks(f, chunk_size):
+                total += rollup(codes, correct)
+                skipped += n_skipped
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+    return total, skipped
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m common.quiz_stats",
+        description="都道府県クイズの累積統計（stats.json）を管理する",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="NDJSON の回答ログを取り込む")
+    p_ingest.add_argument(
+        "paths", nargs="*", default=["-"], help="回答ログ（.gz 可、- は標準入力）"
+    )
+    p_ingest.add_argument("--stats", default=STATS_FILE, help="統計ファイル")
+    p_ingest.add_argument(
+        "--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="チャンクの回答数"
+    )
+    p_ingest.add_argument(
+        "--dry-run", action="store_true", help="保存せず集計を標準出力に書く"
+    )
+
+    p_compact = sub.add_parser("compact", help="追記ログをスナップショットへ畳み込む")
+    p_compact.add_argument("--stats", default=STATS_FILE, help="統計ファイル")
+
+    args = parser.parse_args(argv)
+    store = StatsStore(args.stats)
+
+    if args.command == "compact":
+        store.compact()
+        return 0
+
+    frame, skipped = ingest(args.paths, args.chunk_size)
+    delta = frame_delta(frame)
+    if args.dry_run:
+        json.dump(delta, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        # 差分をまとめて 1 行追記し、そのままスナップショットへ畳み込む
+        store.append(delta)
+        store.compact()
+    print(
+        f"{int(frame['attempts'].to_numpy().sum())} answers ingested, {skipped} skipped",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
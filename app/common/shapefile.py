@@ -0,0 +1,295 @@
+"""
+GeoDataFrame helpers for the shapefile page
+
+Pure functions (no Streamlit calls) so they can be reused and benchmarked.
+"""
+
+import io
+import json
+import math
+import os
+import zipfile
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import geopandas as gpd
+import pydeck as pdk
+import pyogrio
+from common.decks import EncodedData
+from common.geometry import from_shapely, polygon_records, simplify
+from pydeck.types import String
+
+FIRST_CHUNK = 10_000  # features in the first chunk; each later chunk doubles
+FEATURE_BUDGET = int(os.environ.get("FEATURE_BUDGET", "250000"))
+
+
+def pack_shapefile(components: Mapping[str, io.BytesIO]) -> bytes:
+    """
+    Pack uploaded shapefile components into an uncompressed in-memory zip
+
+    GDAL reads zip bytes through /vsizip/ on top of /vsimem/ (pyogrio maps
+    the bytes without copying them), so nothing is written to disk. Each
+    component is copied once, straight from its upload buffer. Entries get
+    one shared basename, so the uploaded names do not have to match.
+
+    Args:
+        components: Uploaded files keyed by extension ("shp", "shx", ...)
+
+    Returns:
+        bytes: Zip archive that gpd.read_file accepts directly
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for ext, file in components.items():
+            with file.getbuffer() as view:
+                archive.writestr(f"layer.{ext}", view)
+    # getvalue() hands over the internal buffer rather than copying it
+    return buffer.getvalue()
+
+
+def shapefile_archive(data: bytes) -> bytes:
+    """
+    Make an uploaded zip readable when its shapefile sits inside a folder
+
+    GDAL only finds a .shp at the root of an in-memory zip, so a zip made
+    from a folder (foo/foo.shp) is repacked with that shapefile's components
+    at the root. Zips that already have a root-level .shp (or no .shp at
+    all) are returned unchanged, without copying.
+
+    Args:
+        data: Uploaded zip bytes
+
+    Returns:
+        bytes: Zip archive that gpd.read_file accepts directly
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        names = [
+            name
+            for name in archive.namelist()
+            # Skip resource forks added by macOS (__MACOSX/, ._foo.shp)
+            if not name.startswith("__MACOSX/")
+            and not name.rpartition("/")[2].startswith("._")
+        ]
+        shps = sorted(name for name in names if name.lower().endswith(".shp"))
+        if not shps or any("/" not in name for name in shps):
+            return data
+        stem = shps[0][:-4]
+        components = {
+            name[len(stem) + 1 :].lower(): io.BytesIO(archive.read(name))
+            for name in names
+            if name.startswith(f"{stem}.")
+        }
+    return pack_shapefile(components)
+
+
+def count_features(data: bytes) -> int:
+    """
+    Count the features of a dataset without reading them
+
+    Args:
+        data: Dataset bytes (zip, shapefile set packed by pack_shapefile, GeoJSON)
+
+    Returns:
+        int: Number of features, or -1 if the driver cannot tell cheaply
+    """
+    return pyogrio.read_info(data)["features"]
+
+
+def read_chunks(
+    data: bytes, budget: int = FEATURE_BUDGET, first: int = FIRST_CHUNK
+) -> Iterator[gpd.GeoDataFrame]:
+    """
+    Read a dataset in row slices of doubling size, up to budget features
+
+    The first chunk is small so a map can be drawn quickly. Doubling keeps
+    the number of reads logarithmic in the dataset size.
+
+    Args:
+        data: Dataset bytes
+        budget: Maximum number of features to read in total
+        first: Size of the first chunk
+
+    Yields:
+        GeoDataFrame: Consecutive row slices in the dataset's own CRS
+    """
+    offset = 0
+    size = first
+    while offset < budget:
+        wanted = min(size, budget - offset)
+        chunk = pyogrio.read_dataframe(data, skip_features=offset, max_features=wanted)
+        if not chunk.empty:
+            yield chunk
+        if len(chunk) < wanted:
+            return  # end of the dataset
+        offset += wanted
+        size *= 2
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedLayer:
+    """
+    Geometry and attributes of a dataset serialized once for deck.gl
+
+    Holds no styling, so it can be cached per dataset and reused when only
+    colors or opacity change. Draw it with common.decks.SplicedDeck.
+    """
+
+    layer_type: str
+    data: EncodedData
+    accessors: dict[str, Any]
+
+    def layer(self, **style) -> pdk.Layer:
+        """
+        Create a layer whose data is spliced in by SplicedDeck
+
+        Args:
+            **style: Styling props (colors, opacity, ...)
+
+        Returns:
+            pydeck.Layer
+        """
+        return pdk.Layer(self.layer_type, self.data.token, **self.accessors, **style)
+
+
+def tooltip_columns(gdf, limit):
+    """
+    Get the attribute columns shown in the tooltip
+
+    Args:
+        gdf: GeoDataFrame
+        limit: Maximum number of columns
+
+    Returns:
+        list: The first limit non-geometry column names
+    """
+    return [column for column in gdf.columns if column != gdf.geometry.name][:limit]
+
+
+def encode_layer(gdf, columns=None, tolerance: float = 0.0) -> EncodedLayer:
+    """
+    Encode a GeoDataFrame for deck.gl without going through __geo_interface__
+
+    Polygons and MultiPolygons are taken from shapely's ragged coordinate
+    arrays and sent to a PolygonLayer as flat positions + holeIndices.
+    Other geometry types fall back to GeoJSON for a GeoJsonLayer.
+
+    Args:
+        gdf: GeoDataFrame in WGS84
+        columns: Attribute columns to send (None sends all of them)
+        tolerance: Simplification tolerance in degrees (0.0 keeps every vertex);
+            simplification preserves topology
+
+    Returns:
+        EncodedLayer
+    """
+    if columns is not None:
+        gdf = gdf[[*columns, gdf.geometry.name]]
+    # Empty or missing geometries draw nothing; dropping them also keeps
+    # degenerate shapes away from simplification
+    missing = gdf.geometry.is_empty | gdf.geometry.isna()
+    if missing.any():
+        gdf = gdf[~missing]
+    flat = from_shapely(gdf.geometry.to_numpy()) if len(gdf) else None
+    if flat is not None:
+        decimals = 6
+        if tolerance:
+            flat = simplify(flat, tolerance)
+            # Digits finer than a tenth of the tolerance carry no information
+            decimals = min(decimals, math.ceil(-math.log10(tolerance)) + 1)
+        records = polygon_records(flat, feature_properties(gdf), decimals)
+        return EncodedLayer(
+            "PolygonLayer",
+            EncodedData.dumps(records),
+            {"get_polygon": "polygon", "position_format": String("XY")},
+        )
+    if tolerance:
+        gdf = gdf.set_geometry(gdf.geometry.simplify(tolerance))
+    # Attributes go through feature_properties like the polygon path, so
+    # dates and other non-JSON types are encoded the same way (ISO strings)
+    collection = json.loads(gdf.geometry.to_json(show_bbox=False))
+    for feature, props in zip(
+        collection["features"], feature_properties(gdf), strict=True
+    ):
+        feature["properties"] = props
+    return EncodedLayer("GeoJsonLayer", EncodedData.dumps(collection), {})
+
+
+def geodataframe_to_geojson(gdf):
+    """
+    Convert GeoDataFrame to GeoJSON format for pydeck
+
+    Args:
+        gdf: GeoDataFrame
+
+    Returns:
+        GeoJSON dictionary
+    """
+    return gdf.__geo_interface__
+
+
+def feature_properties(gdf):
+    """
+    Get JSON-safe attributes of each feature
+
+    Args:
+        gdf: GeoDataFrame
+
+    Returns:
+        list: One properties dictionary per feature
+    """
+    attributes = gdf.drop(columns=gdf.geometry.name)
+    return json.loads(attributes.to_json(orient="records", date_format="iso"))
+
+
+def get_bounds(gdf):
+    """
+    Get the bounding box of a GeoDataFrame
+
+    Args:
+        gdf: GeoDataFrame
+
+    Returns:
+        tuple: (min_lon, min_lat, max_lon, max_lat)
+    """
+    bounds = gdf.total_bounds
+    return bounds[0], bounds[1], bounds[2], bounds[3]
+
+
+def get_center_and_zoom(gdf):
+    """
+    Calculate center point and appropriate zoom level for the data
+
+    Args:
+        gdf: GeoDataFrame
+
+    Returns:
+        tuple: (latitude, longitude, zoom)
+    """
+    min_lon, min_lat, max_lon, max_lat = get_bounds(gdf)
+
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+
+    # Calculate zoom level based on bounds
+    lat_diff = max_lat - min_lat
+    lon_diff = max_lon - min_lon
+    max_diff = max(lat_diff, lon_diff)
+
+    # Simple zoom level calculation
+    if max_diff > 100:
+        zoom = 2
+    elif max_diff > 50:
+        zoom = 3
+    elif max_diff > 20:
+        zoom = 4
+    elif max_diff > 10:
+        zoom = 5
+    elif max_diff > 5:
+        zoom = 6
+    elif max_diff > 1:
+        zoom = 8
+    else:
+        zoom = 10
+
+    return center_lat, center_lon, zoom
@@ -0,0 +1,47 @@
+"""ポリゴンの空間インデックス（STRtree）"""
+
+from typing import Any
+
+import numpy as np
+import shapely
+from common.geometry import FlatGeometry
+from shapely import GeometryType
+
+
+class RegionIndex:
+    """
+    feature ごとの (Multi)Polygon を STRtree に載せ、点や bbox から feature を引く。
+
+    木の探索は O(log n)、候補だけを厳密に判定する。
+    """
+
+    def __init__(
+        self, flat: FlatGeometry, feature_properties: list[dict[str, Any] | None]
+    ) -> None:
+        self._geometries = shapely.from_ragged_array(
+            GeometryType.MULTIPOLYGON,
+            flat.coords,
+            (flat.ring_offsets, flat.polygon_offsets, flat.feature_offsets),
+        )
+        self._tree = shapely.STRtree(self._geometries)
+        self._properties = feature_properties
+
+    def __len__(self) -> int:
+        return len(self._geometries)
+
+    def locate(self, lat: float, lon: float) -> int | None:
+        """点を含む feature の番号（境界上は番号の小さい方、なければ None）。"""
+        hits = self._tree.query(shapely.Point(lon, lat), predicate="intersects")
+        return int(hits.min()) if len(hits) else None
+
+    def properties_at(self, lat: float, lon: float) -> dict[str, Any] | None:
+        """点を含む feature の properties。"""
+        i = self.locate(lat, lon)
+        return None if i is None else self._properties[i]
+
+    def query_bbox(
+        self, min_lon: float, min_lat: float, max_lon: float, max_lat: float
+    ) -> np.ndarray:
+        """bbox と交わる feature の番号（昇順）。"""
+        box = shapely.box(min_lon, min_lat, max_lon, max_lat)
+        return np.sort(self._tree.query(box, predicate="intersects"))
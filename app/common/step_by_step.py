@@ -4,34 +4,83 @@
 FYI: https://nttdocomo-developers.jp/entry/20231216_1
 """
 
+from collections.abc import Callable
+
 import streamlit as st
 from streamlit.runtime.state.session_state_proxy import SessionStateProxy
 
 
 @st.fragment
 class StepByStep:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        keys: tuple[str, ...] = (),
+        validate: Callable[[dict[str, str | None]], bool] | None = None,
+    ) -> None:
+        """
+        Args:
+            keys (tuple[str, ...], optional): ステップ番号と一緒に URL の
+                クエリパラメータへ残す小さな値のキー（文字列のみ）。
+            validate (Callable, optional): URL から読んだ keys の値を受け取り、
+                使ってよければ True を返す関数。False ならステップ 0 から始める。
+        """
         self.ss: SessionStateProxy = st.session_state
+        self.keys = keys
+        self.validate = validate
         self.initialize_state()
 
     def initialize_state(self) -> None:
-        """初期化"""
+        """初期化（クエリパラメータがあればそこから再開する）"""
         if "now" not in self.ss:
-            self.ss.now = 0
+            params = st.query_params
+            step = params.get("step", "0")
+            self.ss.now = int(step) if step.isdigit() else 0
             self.ss.rst = False
+            values = {key: params.get(key) for key in self.keys}
+            if self.validate is not None and not self.validate(values):
+                self.clear()
+                return
+            for key, value in values.items():
+                self.ss[key] = value
+
+    def save(self, **values: str | None) -> None:
+        """keys の値を保存する（URL にも反映）"""
+        if all(self.ss.get(key) == value for key, value in values.items()):
+            return
+        for key, value in values.items():
+            self.ss[key] = value
+        self.sync_query_params()
+
+    def sync_query_params(self) -> None:
+        """ステップ番号と keys の値をクエリパラメータに書き出す"""
+        params = {"step": str(self.ss.now)}
+        for key in self.keys:
+            if (value := self.ss.get(key)) is not None:
+                params[key] = value
+        st.query_params.from_dict(params)
+
+    def clear(self) -> None:
+        """ステップ 0 に戻し、keys の値も消す（URL にも反映）"""
+        self.ss.now = 0
+        for key in self.keys:
+            self.ss[key] = None
+        self.sync_query_params()
 
     def countup(self, reset: bool) -> None:
         """コールバック関数(1/3):次へ"""
         self.ss.now += 1
         self.ss.rst = reset
+        self.sync_query_params()
 
     def countdown(self) -> None:
         """コールバック関数(2/3):戻る"""
         self.ss.now -= 1
+        self.sync_query_params()
 
     def reset(self) -> None:
         """コールバック関数(3/3):リセット"""
         self.ss.now = 0
+        self.sync_query_params()
 
     def buttons(self, now: int, _reset: bool = False) -> None:
         """
@@ -0,0 +1,132 @@
+"""
+Process-wide cache of datasets loaded from uploads
+
+Entries are keyed by a SHA-256 of the uploaded bytes, so a rerun caused by a
+slider or color picker reuses the parsed and reprojected GeoDataFrame instead
+of reading the upload again. The cache is bounded by an estimate of the
+memory the GeoDataFrames hold and evicts the least recently used entries.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from functools import cache
+
+import geopandas as gpd
+import shapely
+
+MAX_BYTES = int(os.environ.get("UPLOAD_CACHE_MB", "512")) * 2**20
+GEOMETRY_OVERHEAD = 100  # rough size of one shapely object, in bytes
+
+
+def upload_key(files: Iterable[tuple[str, io.BytesIO]]) -> str:
+    """
+    Hash uploaded files without reading them into new buffers
+
+    Args:
+        files: (name, file) pairs, e.g. ("shp", UploadedFile)
+
+    Returns:
+        str: Hex digest covering every name and its contents
+    """
+    digest = hashlib.sha256()
+    for name, file in sorted(files, key=lambda item: item[0]):
+        file.seek(0)
+        part = hashlib.file_digest(file, "sha256")
+        file.seek(0)
+        digest.update(name.encode("utf-8"))
+        digest.update(part.digest())
+    return digest.hexdigest()
+
+
+def estimate_nbytes(gdf: gpd.GeoDataFrame) -> int:
+    """
+    Estimate the memory held by a GeoDataFrame
+
+    Args:
+        gdf: GeoDataFrame
+
+    Returns:
+        int: Attribute bytes plus coordinates and per-geometry overhead
+    """
+    geometries = gdf.geometry.to_numpy()
+    attributes = gdf.drop(columns=gdf.geometry.name).memory_usage(deep=True).sum()
+    coordinates = int(shapely.get_num_coordinates(geometries).sum())
+    return int(attributes) + 16 * coordinates + GEOMETRY_OVERHEAD * len(gdf)
+
+
+class UploadCache:
+    """
+    LRU cache of GeoDataFrames bounded by total size
+
+    The same GeoDataFrame is returned to every session, so callers must not
+    modify it in place.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        # key -> (nbytes, gdf)
+        self._entries: OrderedDict[str, tuple[int, gpd.GeoDataFrame]] = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        # A key's lock lives only while a caller holds it, so keys that were
+        # loaded once (and later evicted) do not pile up here
+        self._key_locks: weakref.WeakValueDictionary[str, threading.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def get_or_load(
+        self, key: str, load: Callable[[], gpd.GeoDataFrame | None]
+    ) -> gpd.GeoDataFrame | None:
+        """
+        Return the cached dataset for key, calling load() on a miss
+
+        Args:
+            key: Content hash from upload_key
+            load: Reads the dataset; None (a failed load) is not cached
+
+        Returns:
+            GeoDataFrame or None
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Concurrent uploads of the same file are parsed once
+        with key_lock:
+            with self._lock:
+                hit = self._entries.get(key)
+                if hit is not None:
+                    self._entries.move_to_end(key)
+                    return hit[1]
+
+            gdf = load()
+            if gdf is None:
+                return None
+            nbytes = estimate_nbytes(gdf)
+            if nbytes > self.max_bytes:
+                return gdf  # Too large to keep; still usable for this run
+
+            with self._lock:
+                self._entries[key] = (nbytes, gdf)
+                self._total += nbytes
+                while self._total > self.max_bytes:
+                    _old_key, (old_nbytes, _old) = self._entries.popitem(last=False)
+                    self._total -= old_nbytes
+            return gdf
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+
+@cache
+def get_upload_cache() -> UploadCache:
+    """Cache shared by every session in the process"""
+    return UploadCache()
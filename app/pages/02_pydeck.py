@@ -1,95 +1,47 @@
+import re
+
 import pydeck as pdk
 import requests
+from pydeck.types import String
 import streamlit as st
+from common.decks import PrerenderedDeck
+from common.geojson_loader import PREFECTURE_LAYER
+from common.instrumentation import timed, timings_panel
+from common.japan_bundle import LAYERS, bundle_version
+from common.lod import japan_levels_of_detail
+from common.prefetch import get_prefetcher
 from common.step_by_step import StepByStep
 
+CITY_ZOOM = 8  # Step.2（市区町村）の初期ズーム
+REGION_CODE = re.compile(r"\d{5}")  # N03_007（行政区域コード）
 
-def get_rough_center(geojson):
-    geom = geojson["features"][0]["geometry"]
-
-    if geom["type"] == "Polygon":
-        coords = geom["coordinates"][0]
-    elif geom["type"] == "MultiPolygon":
-        coords = geom["coordinates"][0][0]  # 最初のポリゴンの外周
-    else:
-        raise ValueError("対応していないジオメトリタイプです")
-
-    lon, lat = zip(*coords)
-    return sum(lat) / len(lat), sum(lon) / len(lon)
-
-
-@st.cache_data
-def get_geojson_center(geojson):
-    # 全ての座標を走査して最小・最大の緯度経度を探す
-    def extract_coords(geometry):
-        coords = []
-        if geometry["type"] == "Polygon":
-            coords.extend(geometry["coordinates"][0])
-        elif geometry["type"] == "MultiPolygon":
-            for polygon in geometry["coordinates"]:
-                coords.extend(polygon[0])
-        return coords
-
-    all_coords = []
-    for feature in geojson["features"]:
-        coords = extract_coords(feature["geometry"])
-        all_coords.extend(coords)
-
-    lon = [pt[0] for pt in all_coords]
-    lat = [pt[1] for pt in all_coords]
-
-    center_lon = (min(lon) + max(lon)) / 2
-    center_lat = (min(lat) + max(lat)) / 2
-
-    return center_lat, center_lon
-
-
-@st.cache_data
-def get_geojson_bbox(geojson):
-    def extract_coords(geometry):
-        coords = []
-        if geometry["type"] == "Polygon":
-            coords.extend(geometry["coordinates"][0])
-        elif geometry["type"] == "MultiPolygon":
-            for polygon in geometry["coordinates"]:
-                coords.extend(polygon[0])
-        return coords
 
-    all_coords = []
-    for feature in geojson["features"]:
-        coords = extract_coords(feature["geometry"])
-        all_coords.extend(coords)
-
-    lon = [pt[0] for pt in all_coords]
-    lat = [pt[1] for pt in all_coords]
-
-    return [min(lon), min(lat), max(lon), max(lat)]
-
-
-@st.fragment
-def fetch_data(url: str):
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
-
-
-@st.fragment
-def make_map(DATA, zoom: int = 4, level: int = 1):
+@st.cache_resource(max_entries=16)
+def region_deck(
+    code: str, zoom: int, level: int, bundle: str | None
+) -> PrerenderedDeck:
+    # 地図はレイヤ・zoom ごとに一度だけ作って JSON 化し、全セッションで共有する
+    # （bundle は境界バンドルの version。作り直されたら別のキーになる）
     pcode = f"N03_00{level}"
 
-    lat, lon = get_geojson_center(DATA)
-    # lat, lon = get_rough_center(DATA)
+    # 簡略化済みの段階を zoom で選ぶ（集計・簡略化ともレイヤごとに共有）
+    lod = japan_levels_of_detail(code)
+    DATA = lod.for_zoom(zoom)
+    lat, lon = lod.summary.center
 
     INITIAL_VIEW_STATE = pdk.ViewState(
         latitude=lat, longitude=lon, zoom=zoom, max_zoom=16, pitch=0, bearing=0
     )
 
+    # 座標はフラットな配列（positions / holeIndices）で渡す
     geojson = pdk.Layer(
-        "GeoJsonLayer",
+        "PolygonLayer",
         DATA,
         id="geojson",
         pickable=True,
         opacity=0.1,
+        get_polygon="polygon",
+        position_format=String("XY"),
         get_fill_color="[255, 235, 215]",
         get_line_color=[255, 250, 205],
         get_line_width=100,
@@ -105,81 +57,155 @@ def make_map(DATA, zoom: int = 4, level: int = 1):
         },
     }
 
-    r = pdk.Deck(
+    return PrerenderedDeck(
         map_style="dark_no_labels",
         layers=[geojson],
         initial_view_state=INITIAL_VIEW_STATE,
         tooltip=tooltip,  # type: ignore
     )
 
-    choose_map(r)
+
+@st.fragment
+@timed("make_map")
+def make_map(code: str, zoom: int = 4, level: int = 1):
+    locate_region(code, level)
+
+    with timed("region_deck") as t:
+        deck = region_deck(code, zoom, level, bundle_version())
+        t.payload_bytes = len(deck.to_json())  # 生成済みの JSON なので安い
+
+    with timed("render"):
+        choose_map(deck, code)
+
+
+def locate_region(code: str, level: int):
+    # 入力した緯度・経度を含む領域をサーバ側の空間インデックスで引いて選ぶ
+    text = st.text_input(
+        "Jump to a point (lat, lon)",
+        key=f"locate_{level}",
+        placeholder="35.6812, 139.7671",
+    )
+    if not text:
+        return
+
+    try:
+        lat, lon = (float(v) for v in text.split(","))
+    except ValueError:
+        st.warning("Enter the point as “lat, lon”.")
+        return
+
+    props = japan_levels_of_detail(code).index.properties_at(lat, lon)
+    if props is None:
+        st.warning("No region contains that point.")
+        return
+
+    st.caption(f"{props['N03_001']} {props.get(f'N03_00{level}') or ''}")
+    select_region(code, props)
 
 
 @st.fragment
-def choose_map(r):
+def choose_map(r, code: str):
     event = st.pydeck_chart(r, height=800, on_select="rerun")
 
     with st.expander("*Detailed information on the selected region.*"):
         if obj := event.selection.objects:  # type: ignore
-            st.caption(obj.geojson[0]["properties"]["N03_001"])
-            st.caption(obj.geojson[0]["properties"]["N03_007"])
+            props = obj["geojson"][0]["properties"]
+            st.caption(props["N03_001"])
+            st.caption(props["N03_007"])
             st.write(obj)
 
-            ss.indices = event.selection.indices["geojson"][0]  # type: ignore
-            ss.event = obj
+            select_region(code, props)
+
+
+def select_region(code: str, props: dict):
+    # 地図のクリックでも緯度・経度の入力でも、セッションと URL にはレイヤと
+    # 行政区域コードだけを残す（properties は selected_region で引き直す）
+    step.save(layer=code, region=props["N03_007"])
+
+    if ss.now == 0:
+        prefetch_municipalities(props["N03_007"][:2])
+
+
+def valid_selection(values: dict[str, str | None]) -> bool:
+    # URL から読んだレイヤ・行政区域コードは既知のレイヤと 5 桁のコードだけ受け付ける
+    layer, region = values["layer"], values["region"]
+    if layer is None and region is None:
+        return True
+    return (
+        layer in LAYERS
+        and region is not None
+        and REGION_CODE.fullmatch(region) is not None
+        and (layer == PREFECTURE_LAYER or region.startswith(layer))
+    )
+
+
+def selected_region() -> dict | None:
+    # 選択中の領域の properties（共有キャッシュからコードで引く）
+    if ss.get("layer") is None or ss.get("region") is None:
+        return None
+    try:
+        return japan_levels_of_detail(ss.layer).lookup("N03_007", ss.region)
+    except requests.RequestException:
+        # 取得できなければ最初からやり直す
+        step.clear()
+        return None
+
+
+def prefetch_municipalities(code: str):
+    # 「次へ」を押す前に、選択中の都道府県の市区町村データを裏で取得・簡略化しておく
+    if ss.get("prefetch_code") == code:
+        return
+
+    prefetcher = get_prefetcher()
+    if "prefetch_code" in ss:
+        prefetcher.cancel(ss.prefetch_code)  # 選び直したら前の先読みは取り消す
+    prefetcher.submit(code, lambda: japan_levels_of_detail(code).for_zoom(CITY_ZOOM))
+    ss.prefetch_code = code
 
 
 @st.fragment
+@timed("step1")
 def step1():
     # 都道府県データを取得
-    DATA = fetch_data(
-        "https://raw.githubusercontent.com/ricewin/simplify-japan-geojson/refs/heads/main/GeoJson/prefecture.json"
-    )
-
-    make_map(DATA)
+    make_map(PREFECTURE_LAYER)
 
 
 @st.fragment
+@timed("step2")
 def step2():
-    # 都道府県選択イベントを取得
-    obj = ss.event
+    # 選択中の都道府県を取得
+    props = selected_region()
 
-    if obj is None:
-        step.buttons(ss.now, True)
+    if props is None:
+        # URL の行政区域コードが見つからない・取得に失敗した → 最初からやり直す
+        step.clear()
         st.rerun()
 
-    pref = obj.geojson[0]["properties"]["N03_001"]
-    code = obj.geojson[0]["properties"]["N03_007"][:2]
+    pref = props["N03_001"]
+    code = props["N03_007"][:2]
     st.caption(f"{pref}")
 
-    DATA = fetch_data(
-        f"https://raw.githubusercontent.com/ricewin/simplify-japan-geojson/refs/heads/main/GeoJson/{code}.json"
-    )
-
-    make_map(DATA, zoom=8, level=4)
+    get_prefetcher().wait(code)  # 先読み中なら終わるのを待つ
+    make_map(code, zoom=CITY_ZOOM, level=4)
 
 
 @st.fragment
+@timed("step3")
 def step3():
     st.info("Continue making...")
-    obj = ss.event
+    props = selected_region()
 
-    st.write(obj.geojson[0]["properties"])
-
-    # bbox = get_geojson_bbox(obj.geojson[0])
-    # print("BBOX:", bbox)
+    st.write(props)
 
 
 ss = st.session_state
 
-if "event" not in ss:
-    ss.event = None
-
 # main
 st.title("In progress")
 st.caption("*To be continued...*")
 
-step = StepByStep()
+# ステップ番号と選択中の領域（レイヤ・行政区域コード）は URL からも再開できる
+step = StepByStep(keys=("layer", "region"), validate=valid_selection)
 
 try:
     if ss.now == 0:
@@ -201,3 +227,4 @@ try:
         st.success("All steps have been completed.")
 finally:
     step.buttons(ss.now)
+    timings_panel()
@@ -1,180 +1,267 @@
 """
 Shapefile Visualization with PyDeck
 
-This page demonstrates how to visualize shapefiles using pydeck's GeoJsonLayer.
+This page demonstrates how to visualize shapefiles with pydeck. Polygons are
+encoded as flat coordinate arrays for a PolygonLayer (other geometry types use
+a GeoJsonLayer), without going through __geo_interface__.
 It supports both Shapefile (.shp) and GeoJSON (.geojson) formats.
 """
 
 import geopandas as gpd
+import pandas as pd
 import pydeck as pdk
 import streamlit as st
+from common.decks import SplicedDeck
+from common.shapefile import (
+    FEATURE_BUDGET,
+    count_features,
+    encode_layer,
+    geodataframe_to_geojson,
+    get_center_and_zoom,
+    pack_shapefile,
+    read_chunks,
+    shapefile_archive,
+    tooltip_columns,
+)
+from common.lod import tolerance_for_zoom
+from common.upload_cache import get_upload_cache, upload_key
 
 st.set_page_config(page_title="Shapefile Visualization", page_icon="🗾", layout="wide")
 
 # Constants
 MAX_TOOLTIP_PROPERTIES = 5  # Maximum number of properties to show in tooltip
+GEOJSON_PREVIEW_FEATURES = 100  # Features shown in the "View GeoJSON Format" expander
 
 
-def load_shapefile_from_upload(uploaded_files):
+def load_shapefile_from_upload(uploaded_files, budget, preview):
     """
-    Load shapefile from uploaded files (.shp, .shx, .dbf, .prj)
+    Load shapefile from uploaded files (.shp, .shx, .dbf, .prj) or a .zip
+
+    Parsed data is cached by the hash of the uploaded bytes, so reruns
+    (e.g. changing the styling) do not read the files again.
 
     Args:
         uploaded_files: Dictionary of uploaded files with extensions as keys
+        budget: Maximum number of features to load
+        preview: Placeholder for the map drawn while loading
 
     Returns:
         GeoDataFrame containing the shapefile data
     """
+    if "shp" not in uploaded_files and "zip" not in uploaded_files:
+        st.error("Uploaded shapefile set must include a .shp file.")
+        return None
     try:
-        # Shapefileは複数のファイルで構成されているため、一時的に保存
-        import os
-        import tempfile
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Upload files to temporary directory
-            base_name = None
-            for ext, file in uploaded_files.items():
-                if ext == "shp":
-                    base_name = file.name.replace(".shp", "")
-                file_path = os.path.join(tmpdir, file.name)
-                with open(file_path, "wb") as f:
-                    f.write(file.read())
-
-            # Ensure that a .shp file was provided
-            if base_name is None:
-                st.error("Uploaded shapefile set must include a .shp file.")
-                return None
-
-            # Read shapefile
-            shp_path = os.path.join(tmpdir, f"{base_name}.shp")
-            gdf = gpd.read_file(shp_path)
-
-            # Ensure CRS is WGS84 (EPSG:4326) for web mapping
-            if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
-                gdf = gdf.to_crs(epsg=4326)
-
-            return gdf
+        key = f"{session_upload_key(uploaded_files.items())}:{budget}"
+        return get_upload_cache().get_or_load(
+            key,
+            lambda: read_progressively(
+                shapefile_bytes(uploaded_files), budget, preview, key
+            ),
+        )
     except Exception as e:
         st.error(f"Error loading shapefile: {str(e)}")
         return None
 
 
-def load_geojson_from_upload(uploaded_file):
+def session_upload_key(files):
     """
-    Load GeoJSON from uploaded file
+    Hash uploaded files only when the upload changes
+
+    Reruns (e.g. changing colors or opacity) reuse the hash stored in the
+    session, keyed on each uploader's file_id and size.
 
     Args:
-        uploaded_file: Uploaded GeoJSON file
+        files: (name, UploadedFile) pairs
 
     Returns:
-        GeoDataFrame containing the GeoJSON data
+        str: Hex digest from upload_key
     """
-    try:
-        gdf = gpd.read_file(uploaded_file)
+    files = list(files)
+    ids = tuple(sorted((name, file.file_id, file.size) for name, file in files))
+    memo = st.session_state.get("upload_key")
+    if memo is None or memo[0] != ids:
+        memo = st.session_state["upload_key"] = (ids, upload_key(files))
+    return memo[1]
 
-        # Ensure CRS is WGS84 (EPSG:4326)
-        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
-            gdf = gdf.to_crs(epsg=4326)
 
-        return gdf
-    except Exception as e:
-        st.error(f"Error loading GeoJSON: {str(e)}")
-        return None
+def shapefile_bytes(uploaded_files):
+    """
+    Get an uploaded shapefile as bytes GDAL can open, without temporary files
 
+    Args:
+        uploaded_files: Dictionary of uploaded files with extensions as keys
 
-@st.cache_data
-def load_sample_data():
+    Returns:
+        bytes: Zip archive holding the shapefile
     """
-    Load sample data from a public GeoJSON source
+    if "zip" in uploaded_files:
+        # Zipped shapefile: GDAL reads the upload buffer as-is unless the
+        # shapefile is inside a folder
+        return shapefile_archive(uploaded_files["zip"].getvalue())
+    return pack_shapefile(uploaded_files)
+
+
+def load_geojson_from_upload(uploaded_file, budget, preview):
+    """
+    Load GeoJSON from uploaded file (cached by the hash of its bytes)
+
+    Args:
+        uploaded_file: Uploaded GeoJSON file
+        budget: Maximum number of features to load
+        preview: Placeholder for the map drawn while loading
 
     Returns:
-        GeoDataFrame containing sample data
+        GeoDataFrame containing the GeoJSON data
     """
-    # Use Natural Earth low-res countries data
-    url = "https://raw.githubusercontent.com/nvkelso/natural-earth-vector/master/geojson/ne_110m_admin_0_countries.geojson"
     try:
-        gdf = gpd.read_file(url)
-        return gdf
+        key = f"{session_upload_key([('geojson', uploaded_file)])}:{budget}"
+        return get_upload_cache().get_or_load(
+            key,
+            lambda: read_progressively(uploaded_file.getvalue(), budget, preview, key),
+        )
     except Exception as e:
-        st.error(f"Error loading sample data: {str(e)}")
+        st.error(f"Error loading GeoJSON: {str(e)}")
         return None
 
 
-def geodataframe_to_geojson(gdf):
+def read_progressively(data, budget, preview, key):
     """
-    Convert GeoDataFrame to GeoJSON format for pydeck
+    Read a dataset chunk by chunk, showing a map of the first chunk
+
+    pyogrio maps the bytes onto /vsimem/ without copying them, and at most
+    budget features are read. Later chunks only update the progress line:
+    redrawing everything loaded so far after each chunk would cost O(n^2).
 
     Args:
-        gdf: GeoDataFrame
+        data: Dataset bytes
+        budget: Maximum number of features to load
+        preview: Placeholder for the map drawn while loading
+        key: Dataset key, stored in attrs["dataset_key"]
 
     Returns:
-        GeoJSON dictionary
+        GeoDataFrame in WGS84 (attrs["total_features"] holds the dataset size,
+        or None if the driver cannot count it and the budget was reached)
+    """
+    # -1 when the driver cannot count features without reading them all
+    total = count_features(data)
+    chunks = []
+    loaded = 0
+    with preview.container():
+        status = st.empty()
+        for chunk in read_chunks(data, budget):
+            chunks.append(to_wgs84(chunk))
+            loaded += len(chunk)
+            if total > 0:
+                status.progress(
+                    min(loaded / total, 1.0),
+                    text=f"{loaded:,} of {total:,} features loaded",
+                )
+            else:
+                status.caption(f"{loaded:,} features loaded (total unknown)")
+            if len(chunks) == 1:
+                st.pydeck_chart(create_pydeck_map(chunks[0]), height=600)
+    preview.empty()
+    if not chunks:
+        raise ValueError("The dataset contains no features.")
+    gdf = gpd.GeoDataFrame(pd.concat(chunks, ignore_index=True))
+    if total >= 0:
+        gdf.attrs["total_features"] = max(total, loaded)
+    else:
+        # Stopping short of the budget means the whole dataset was read
+        gdf.attrs["total_features"] = loaded if loaded < budget else None
+    gdf.attrs["dataset_key"] = key
+    return gdf
+
+
+def report_loaded(gdf):
     """
-    return gdf.__geo_interface__
+    Show how many features were loaded, warning when the budget cut them off
+
+    Args:
+        gdf: GeoDataFrame from read_progressively
+    """
+    total = gdf.attrs.get("total_features", len(gdf))
+    if total is None:
+        st.sidebar.warning(
+            f"Loaded {len(gdf):,} features (feature budget reached; total unknown)"
+        )
+    elif len(gdf) < total:
+        st.sidebar.warning(
+            f"Loaded {len(gdf):,} of {total:,} features (feature budget reached)"
+        )
+    else:
+        st.sidebar.success(f"Loaded {len(gdf)} features")
 
 
-def get_bounds(gdf):
+def to_wgs84(gdf):
     """
-    Get the bounding box of a GeoDataFrame
+    Ensure CRS is WGS84 (EPSG:4326) for web mapping
 
     Args:
         gdf: GeoDataFrame
 
     Returns:
-        tuple: (min_lon, min_lat, max_lon, max_lat)
+        GeoDataFrame in EPSG:4326 (unchanged if already, or if the CRS is unknown)
     """
-    bounds = gdf.total_bounds
-    return bounds[0], bounds[1], bounds[2], bounds[3]
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+    return gdf
 
 
-def get_center_and_zoom(gdf):
+@st.cache_data
+def load_sample_data():
     """
-    Calculate center point and appropriate zoom level for the data
+    Load sample data from a public GeoJSON source
+
+    Returns:
+        GeoDataFrame containing sample data
+    """
+    # Use Natural Earth low-res countries data
+    url = "https://raw.githubusercontent.com/nvkelso/natural-earth-vector/master/geojson/ne_110m_admin_0_countries.geojson"
+    try:
+        gdf = gpd.read_file(url)
+        gdf.attrs["dataset_key"] = "sample"
+        return gdf
+    except Exception as e:
+        st.error(f"Error loading sample data: {str(e)}")
+        return None
+
+
+@st.cache_resource(max_entries=8)
+def encoded_layer(key, columns, tolerance, _gdf):
+    """
+    Encode a dataset once per tolerance and share it across reruns and sessions
 
     Args:
-        gdf: GeoDataFrame
+        key: Dataset key (attrs["dataset_key"])
+        columns: Tuple of attribute columns to send
+        tolerance: Simplification tolerance in degrees
+        _gdf: GeoDataFrame (not hashed; identified by key)
 
     Returns:
-        tuple: (latitude, longitude, zoom)
+        EncodedLayer
     """
-    min_lon, min_lat, max_lon, max_lat = get_bounds(gdf)
-
-    center_lat = (min_lat + max_lat) / 2
-    center_lon = (min_lon + max_lon) / 2
-
-    # Calculate zoom level based on bounds
-    lat_diff = max_lat - min_lat
-    lon_diff = max_lon - min_lon
-    max_diff = max(lat_diff, lon_diff)
-
-    # Simple zoom level calculation
-    if max_diff > 100:
-        zoom = 2
-    elif max_diff > 50:
-        zoom = 3
-    elif max_diff > 20:
-        zoom = 4
-    elif max_diff > 10:
-        zoom = 5
-    elif max_diff > 5:
-        zoom = 6
-    elif max_diff > 1:
-        zoom = 8
-    else:
-        zoom = 10
-
-    return center_lat, center_lon, zoom
+    return encode_layer(_gdf, list(columns), tolerance)
 
 
-def create_pydeck_map(gdf, fill_color=None, line_color=None, opacity=0.5):
+def create_pydeck_map(
+    gdf, fill_color=None, line_color=None, opacity=0.5, simplified=True
+):
     """
     Create a pydeck map from GeoDataFrame
 
+    The geometry is encoded once per dataset (see encoded_layer), so a
+    restyle only serializes the colors and opacity. Only the tooltip
+    columns are sent, and the geometry is simplified to about half a pixel
+    at the initial zoom.
+
     Args:
         gdf: GeoDataFrame to visualize
         fill_color: RGB color for polygon fill
         line_color: RGB color for lines
         opacity: Opacity of the fill (0-1)
+        simplified: Simplify the geometry for the initial zoom
 
     Returns:
         pydeck.Deck object
@@ -183,9 +270,6 @@ def create_pydeck_map(gdf, fill_color=None, line_color=None, opacity=0.5):
         fill_color = [255, 235, 215]
     if line_color is None:
         line_color = [255, 250, 205]
-    # Convert to GeoJSON
-    geojson_data = geodataframe_to_geojson(gdf)
-
     # Get center and zoom
     center_lat, center_lon, zoom = get_center_and_zoom(gdf)
 
@@ -194,29 +278,32 @@ def create_pydeck_map(gdf, fill_color=None, line_color=None, opacity=0.5):
         latitude=center_lat, longitude=center_lon, zoom=zoom, pitch=0, bearing=0
     )
 
-    # Create GeoJsonLayer
-    geojson_layer = pdk.Layer(
-        "GeoJsonLayer",
-        geojson_data,
-        opacity=opacity,
-        stroked=True,
-        filled=True,
-        extruded=False,
-        wireframe=True,
-        get_fill_color=fill_color,
-        get_line_color=line_color,
-        get_line_width=20,
-        pickable=True,
-    )
+    style = {
+        "opacity": opacity,
+        "stroked": True,
+        "filled": True,
+        "extruded": False,
+        "wireframe": True,
+        "get_fill_color": fill_color,
+        "get_line_color": line_color,
+        "get_line_width": 20,
+        "pickable": True,
+    }
+
+    # Polygons go out as flat coordinate arrays; other geometry types as GeoJSON
+    columns = tooltip_columns(gdf, MAX_TOOLTIP_PROPERTIES)
+    tolerance = tolerance_for_zoom(zoom) if simplified else 0.0
+    key = gdf.attrs.get("dataset_key")
+    if key is not None:
+        encoded = encoded_layer(key, tuple(columns), tolerance, gdf)
+    else:
+        encoded = encode_layer(gdf, columns, tolerance)
+    layer = encoded.layer(**style)
 
     # Create tooltip - show all properties (limited to MAX_TOOLTIP_PROPERTIES)
     tooltip = {
         "html": "<b>Properties:</b><br/>"
-        + "<br/>".join(
-            [f"{{{key}}}" for key in gdf.columns if key != "geometry"][
-                :MAX_TOOLTIP_PROPERTIES
-            ]
-        ),
+        + "<br/>".join(f"{{{column}}}" for column in columns),
         "style": {
             "backgroundColor": "steelblue",
             "color": "white",
@@ -226,8 +313,9 @@ def create_pydeck_map(gdf, fill_color=None, line_color=None, opacity=0.5):
     }
 
     # Create deck
-    deck = pdk.Deck(
-        layers=[geojson_layer],
+    deck = SplicedDeck(
+        layers=[layer],
+        encoded=[encoded.data],
         initial_view_state=view_state,
         tooltip=tooltip,  # pyright: ignore[reportArgumentType]
         map_style="light",
@@ -239,20 +327,31 @@ def create_pydeck_map(gdf, fill_color=None, line_color=None, opacity=0.5):
 # Main UI
 st.title("🗾 Shapefile Visualization with PyDeck")
 st.markdown("""
-This application demonstrates how to visualize geographic data using PyDeck's GeoJsonLayer.
+This application demonstrates how to visualize geographic data using PyDeck.
 
 **Supported formats:**
-- **Shapefile** (.shp + .shx + .dbf + .prj) - Upload all required files together
+- **Shapefile** (.shp + .shx + .dbf + .prj) - Upload all required files together, or one .zip
 - **GeoJSON** (.geojson or .json) - Upload a single file
 
-**Note:** Shapefiles are automatically converted to GeoJSON format for visualization.
+**Note:** Polygons are drawn with a PolygonLayer from flat coordinate arrays; other geometry types are drawn as GeoJSON.
 """)
 
+# Map drawn while an upload is still loading
+preview = st.empty()
+
 # Sidebar for data source selection
 st.sidebar.header("Data Source")
 data_source = st.sidebar.radio(
     "Choose data source:", ["Sample Data", "Upload Shapefile", "Upload GeoJSON"]
 )
+if data_source != "Sample Data":
+    budget = st.sidebar.number_input(
+        "Feature budget",
+        min_value=1_000,
+        value=FEATURE_BUDGET,
+        step=10_000,
+        help="Maximum number of features to load (caps memory use)",
+    )
 
 gdf = None
 
@@ -270,10 +369,15 @@ elif data_source == "Upload Shapefile":
     - .shx (required)
     - .dbf (required)
     - .prj (optional but recommended)
+
+    Or upload them together as one .zip file.
     """)
 
     uploaded_files = {}
 
+    zip_file = st.sidebar.file_uploader(
+        "Upload zipped shapefile", type=["zip"], key="zip"
+    )
     # File uploaders for each shapefile component
     shp_file = st.sidebar.file_uploader("Upload .shp file", type=["shp"], key="shp")
     shx_file = st.sidebar.file_uploader("Upload .shx file", type=["shx"], key="shx")
@@ -282,17 +386,20 @@ elif data_source == "Upload Shapefile":
         "Upload .prj file (optional)", type=["prj"], key="prj"
     )
 
-    if shp_file and shx_file and dbf_file:
+    if zip_file:
+        uploaded_files["zip"] = zip_file
+    elif shp_file and shx_file and dbf_file:
         uploaded_files["shp"] = shp_file
         uploaded_files["shx"] = shx_file
         uploaded_files["dbf"] = dbf_file
         if prj_file:
             uploaded_files["prj"] = prj_file
 
+    if uploaded_files:
         with st.spinner("Loading shapefile..."):
-            gdf = load_shapefile_from_upload(uploaded_files)
+            gdf = load_shapefile_from_upload(uploaded_files, budget, preview)
             if gdf is not None:
-                st.sidebar.success(f"Loaded {len(gdf)} features")
+                report_loaded(gdf)
 
 elif data_source == "Upload GeoJSON":
     geojson_file = st.sidebar.file_uploader(
@@ -301,9 +408,9 @@ elif data_source == "Upload GeoJSON":
 
     if geojson_file:
         with st.spinner("Loading GeoJSON..."):
-            gdf = load_geojson_from_upload(geojson_file)
+            gdf = load_geojson_from_upload(geojson_file, budget, preview)
             if gdf is not None:
-                st.sidebar.success(f"Loaded {len(gdf)} features")
+                report_loaded(gdf)
 
 # Display data and map if loaded
 if gdf is not None:
@@ -334,6 +441,11 @@ if gdf is not None:
     fill_color = st.sidebar.color_picker("Fill Color", "#FFE4B5")
     line_color = st.sidebar.color_picker("Line Color", "#FFFACD")
     opacity = st.sidebar.slider("Opacity", 0.0, 1.0, 0.5, 0.1)
+    simplified = st.sidebar.toggle(
+        "Simplify geometry",
+        value=True,
+        help="Drop detail finer than about half a pixel at the initial zoom",
+    )
 
     # Convert hex to RGB
     fill_rgb = [int(fill_color[i : i + 2], 16) for i in (1, 3, 5)]
@@ -341,7 +453,7 @@ if gdf is not None:
 
     # Create and display map
     st.subheader("Map Visualization")
-    deck = create_pydeck_map(gdf, fill_rgb, line_rgb, opacity)
+    deck = create_pydeck_map(gdf, fill_rgb, line_rgb, opacity, simplified)
     st.pydeck_chart(deck, height=600)
 
     # Display attribute table
@@ -350,7 +462,11 @@ if gdf is not None:
 
     # Display GeoJSON
     with st.expander("View GeoJSON Format"):
-        st.json(geodataframe_to_geojson(gdf), expanded=False)
+        if len(gdf) > GEOJSON_PREVIEW_FEATURES:
+            st.caption(f"First {GEOJSON_PREVIEW_FEATURES} of {len(gdf):,} features")
+        st.json(
+            geodataframe_to_geojson(gdf.head(GEOJSON_PREVIEW_FEATURES)), expanded=False
+        )
 
     # Technical details
     with st.expander("Technical Details"):
@@ -359,19 +475,34 @@ if gdf is not None:
 
         **Shapefile Handling:**
         1. Shapefiles are uploaded with all required components (.shp, .shx, .dbf, .prj)
-        2. Files are temporarily saved to disk (shapefiles require file system access)
+           or as a single .zip
+        2. Components are packed into an uncompressed in-memory zip (a .zip upload
+           is used as-is unless the shapefile is inside a folder), which GDAL
+           reads through `/vsizip/` and `/vsimem/`, so nothing is written to disk
         3. GeoPandas reads the shapefile
         4. Data is reprojected to WGS84 (EPSG:4326) if necessary
-        5. GeoDataFrame is converted to GeoJSON format
+        5. Features are read in row slices of doubling size up to the feature
+           budget; the first slice is drawn right away and later slices update
+           a progress bar ("N of M loaded")
+        6. The result is cached under a SHA-256 of the uploaded bytes
+           (size-bounded LRU), so restyling does not reload the files
 
         **GeoJSON Handling:**
-        1. GeoJSON files are read directly by GeoPandas
+        1. GeoJSON files are read directly from the upload buffer by GeoPandas
         2. Data is reprojected to WGS84 (EPSG:4326) if necessary
-        3. GeoDataFrame is ready for visualization
+        3. Features are read and cached the same way as shapefiles
 
         **PyDeck Visualization:**
-        - Uses `GeoJsonLayer` which supports both Polygon and MultiPolygon geometries
+        - Polygon and MultiPolygon data is drawn with `PolygonLayer` from flat
+          coordinate arrays (`positions` + `holeIndices`), which is much smaller
+          to serialize and parse than nested GeoJSON
+        - Other geometry types fall back to `GeoJsonLayer`
+        - The encoded geometry is cached per dataset and spliced into the deck
+          JSON, so changing colors or opacity does not re-encode it
         - Automatically calculates appropriate zoom level and center point
+        - Geometry is simplified (topology-preserving, vectorized shapely) to about
+          half a pixel at that zoom, and only the tooltip columns are sent;
+          each tolerance is encoded once per dataset
         - Features are pickable with tooltips showing attributes
 
         **Libraries Used:**
@@ -385,8 +516,9 @@ else:
 st.markdown("---")
 st.markdown("""
 **Tips:**
-- For large shapefiles, consider simplifying the geometry first
-- Ensure all shapefile components have the same basename
+- Turn off "Simplify geometry" to send every vertex (slower for large shapefiles)
+- Lower the feature budget to keep very large layers responsive
+- Zipping a shapefile lets you upload all of its components at once
 - GeoJSON is often easier to work with for web applications
 - The visualization automatically handles coordinate system conversion
 """)
@@ -0,0 +1,154 @@
+"""
+Benchmark fixtures for the GeoJSON / GeoDataFrame helpers.
+
+Each benchmark reports throughput (vertices per second) and peak traced
+memory. Benchmarks over at least MIN_GATED_VERTICES vertices fail when they
+regress past a threshold against benchmarks/baseline.json; smaller ones are
+only reported, since they are dominated by noise on shared CI runners. Times are stored relative to a fixed calibration
+workload so the baseline carries over between machines.
+
+    uv run pytest benchmarks                  # 1k and 100k vertices
+    BENCH_LARGE=1 uv run pytest benchmarks    # also 1M vertices
+    BENCH_UPDATE=1 uv run pytest benchmarks   # rewrite the baseline
+
+Thresholds: BENCH_MAX_SLOWDOWN (default 3.0) and BENCH_MAX_MEMORY_GROWTH
+(default 1.5).
+"""
+
+import gc
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+MAX_SLOWDOWN = float(os.environ.get("BENCH_MAX_SLOWDOWN", "3.0"))
+MAX_MEMORY_GROWTH = float(os.environ.get("BENCH_MAX_MEMORY_GROWTH", "1.5"))
+UPDATE = os.environ.get("BENCH_UPDATE", "") not in ("", "0")
+MIN_ROUNDS = 3
+MAX_SECONDS = 1.0  # time budget per benchmark (after the first round)
+MIN_GATED_VERTICES = 100_000  # smaller inputs are reported but never fail
+MIN_GATED_SECONDS = 10e-3  # faster calls are too noisy to gate on time
+MIN_GATED_BYTES = 2**20  # likewise for small allocations
+
+
+_results: dict[str, dict[str, float]] = {}
+
+
+def _best_time(func, *args) -> float:
+    best = float("inf")
+    spent = 0.0
+    rounds = 0
+    while rounds < MIN_ROUNDS or spent < MAX_SECONDS / 4:
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        rounds += 1
+        if spent > MAX_SECONDS:
+            break
+    return best
+
+
+def _calibrate() -> float:
+    """Time a fixed mix of interpreter and NumPy work."""
+    rng = np.random.default_rng(0)
+    values = rng.random(500_000)
+
+    def workload():
+        sum(float(v) for v in values[:200_000].tolist())
+        np.sort(values)
+
+    return _best_time(workload)
+
+
+@pytest.fixture(scope="session")
+def calibration() -> float:
+    return _calibrate()
+
+
+@pytest.fixture(scope="session")
+def baseline() -> dict[str, dict[str, float]]:
+    if not BASELINE_FILE.exists():
+        return {}
+    return json.loads(BASELINE_FILE.read_text(encoding="utf-8"))["benchmarks"]
+
+
+@pytest.fixture
+def bench(request, calibration, baseline):
+    """
+    Run ``func(*args)`` as a benchmark over ``vertices`` vertices.
+
+    Returns the result of the last call so tests can sanity-check it.
+    """
+
+    def run(func, *args, vertices: int):
+        gc.collect()
+        seconds = _best_time(func, *args)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = func(*args)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        name = request.node.name
+        measured = {
+            "relative_time": seconds / calibration,
+            "peak_bytes": peak,
+            "vertices_per_second": vertices / seconds,
+        }
+        _results[name] = measured
+
+        expected = baseline.get(name)
+        if expected is not None and not UPDATE and vertices >= MIN_GATED_VERTICES:
+            slowdown = measured["relative_time"] / expected["relative_time"]
+            growth = peak / max(expected["peak_bytes"], 1)
+            if slowdown > MAX_SLOWDOWN and seconds >= MIN_GATED_SECONDS:
+                pytest.fail(
+                    f"{name}: {slowdown:.2f}x slower than baseline "
+                    f"(limit {MAX_SLOWDOWN}x)"
+                )
+            if growth > MAX_MEMORY_GROWTH and peak >= MIN_GATED_BYTES:
+                pytest.fail(
+                    f"{name}: peak memory {growth:.2f}x baseline "
+                    f"(limit {MAX_MEMORY_GROWTH}x)"
+                )
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not UPDATE or not _results:
+        return
+    merged = {}
+    if BASELINE_FILE.exists():
+        merged = json.loads(BASELINE_FILE.read_text(encoding="utf-8"))["benchmarks"]
+    for name, measured in _results.items():
+        merged[name] = {
+            "relative_time": round(measured["relative_time"], 6),
+            "peak_bytes": measured["peak_bytes"],
+        }
+    BASELINE_FILE.write_text(
+        json.dumps({"benchmarks": dict(sorted(merged.items()))}, indent=2) + "\n",
+        encoding="utf-8",
+    )
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("benchmarks")
+    for name, measured in sorted(_results.items()):
+        terminalreporter.write_line(
+            f"{name:<50} {measured['vertices_per_second'] / 1e6:8.2f} Mvert/s"
+            f" {measured['peak_bytes'] / 2**20:9.1f} MiB peak"
+        )
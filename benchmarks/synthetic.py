@@ -0,0 +1,110 @@
+"""
+Deterministic synthetic polygon data for the benchmarks (no network).
+
+Every feature has RING_VERTICES vertices in total, so a dataset of n
+vertices has n // RING_VERTICES features.
+
+- "polygon": one closed ring per feature
+- "multipolygon": two parts per feature, the first with one hole
+"""
+
+import os
+from functools import cache
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+RING_VERTICES = 100
+KINDS = ["polygon", "multipolygon"]
+LARGE = os.environ.get("BENCH_LARGE", "") not in ("", "0")
+
+SIZES = [
+    pytest.param(1_000, id="1k"),
+    pytest.param(100_000, id="100k"),
+    pytest.param(
+        1_000_000,
+        id="1M",
+        marks=pytest.mark.skipif(not LARGE, reason="set BENCH_LARGE=1"),
+    ),
+]
+
+
+def _rings(centers: np.ndarray, radius: float, n: int, rng) -> np.ndarray:
+    """(F, n, 2) closed, counter-clockwise, slightly jagged rings."""
+    angles = np.linspace(0, 2 * np.pi, n - 1, endpoint=False)
+    radii = radius * (1 + 0.2 * rng.random((len(centers), n - 1)))
+    rings = np.empty((len(centers), n, 2))
+    rings[:, :-1, 0] = centers[:, None, 0] + radii * np.cos(angles)
+    rings[:, :-1, 1] = centers[:, None, 1] + radii * np.sin(angles)
+    rings[:, -1] = rings[:, 0]
+    return rings
+
+
+@cache
+def _parts(vertices: int, kind: str) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(vertices)
+    count = vertices // RING_VERTICES
+    centers = np.column_stack(
+        [rng.uniform(129, 146, count), rng.uniform(30, 46, count)]
+    )
+    if kind == "polygon":
+        return (_rings(centers, 0.05, RING_VERTICES, rng),)
+    quarter = RING_VERTICES // 4
+    shells = _rings(centers, 0.05, 2 * quarter, rng)
+    holes = _rings(centers, 0.02, quarter, rng)[:, ::-1]  # clockwise
+    islands = _rings(centers + 0.2, 0.03, quarter, rng)
+    return shells, holes, islands
+
+
+@cache
+def feature_collection(vertices: int, kind: str) -> dict:
+    """GeoJSON FeatureCollection with ``vertices`` vertices in total."""
+    parts = [p.tolist() for p in _parts(vertices, kind)]
+    if kind == "polygon":
+        geometries = [{"type": "Polygon", "coordinates": [ring]} for ring in parts[0]]
+    else:
+        geometries = [
+            {"type": "MultiPolygon", "coordinates": [[shell, hole], [island]]}
+            for shell, hole, island in zip(*parts)
+        ]
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"N03_001": f"P{i % 47 + 1:02d}", "N03_007": f"{i:05d}"},
+                "geometry": geometry,
+            }
+            for i, geometry in enumerate(geometries)
+        ],
+    }
+
+
+@cache
+def geodataframe(vertices: int, kind: str) -> gpd.GeoDataFrame:
+    """GeoDataFrame (EPSG:4326) with the same shapes as feature_collection."""
+    parts = _parts(vertices, kind)
+    if kind == "polygon":
+        geometries = shapely.polygons(parts[0])
+    else:
+        shells, holes, islands = parts
+        geometries = shapely.multipolygons(
+            np.stack(
+                [
+                    shapely.polygons(shells, holes=holes[:, None]),
+                    shapely.polygons(islands),
+                ],
+                axis=1,
+            )
+        )
+    count = len(geometries)
+    return gpd.GeoDataFrame(
+        {
+            "name": [f"feature {i}" for i in range(count)],
+            "value": np.arange(count, dtype=float),
+        },
+        geometry=geometries,
+        crs="EPSG:4326",
+    )
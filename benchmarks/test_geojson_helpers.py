@@ -0,0 +1,77 @@
+"""Throughput / peak-memory benchmarks for the map pages' geometry helpers."""
+
+import pytest
+from common.geometry import (
+    flatten,
+    polygon_records,
+    properties,
+    rough_center,
+    summarize,
+)
+from common.shapefile import (
+    encode_layer,
+    geodataframe_to_geojson,
+    get_bounds,
+    get_center_and_zoom,
+)
+from synthetic import KINDS, SIZES, feature_collection, geodataframe
+
+
+# ---- 02_pydeck: GeoJSON dicts ----
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_summarize(bench, vertices, kind):
+    data = feature_collection(vertices, kind)
+    summary = bench(summarize, data, vertices=vertices)
+    assert summary.num_vertices == vertices
+    assert 129 <= summary.center[1] <= 147
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_rough_center(bench, vertices, kind):
+    data = feature_collection(vertices, kind)
+    lat, lon = bench(rough_center, data, vertices=vertices)
+    assert 29 <= lat <= 47 and 128 <= lon <= 147
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_polygon_records(bench, vertices, kind):
+    data = feature_collection(vertices, kind)
+    flat, props = flatten(data), properties(data)
+    records = bench(polygon_records, flat, props, vertices=vertices)
+    assert sum(len(r["polygon"]["positions"]) for r in records) == 2 * vertices
+
+
+# ---- 04_shapefile_pydeck: GeoDataFrames ----
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_geodataframe_to_geojson(bench, vertices, kind):
+    gdf = geodataframe(vertices, kind)
+    geojson = bench(geodataframe_to_geojson, gdf, vertices=vertices)
+    assert len(geojson["features"]) == len(gdf)
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_encode_layer(bench, vertices, kind):
+    gdf = geodataframe(vertices, kind)
+    encoded = bench(encode_layer, gdf, vertices=vertices)
+    assert encoded.layer_type == "PolygonLayer"
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_get_bounds(bench, vertices, kind):
+    gdf = geodataframe(vertices, kind)
+    min_lon, min_lat, max_lon, max_lat = bench(get_bounds, gdf, vertices=vertices)
+    assert min_lon < max_lon and min_lat < max_lat
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("vertices", SIZES)
+def test_get_center_and_zoom(bench, vertices, kind):
+    gdf = geodataframe(vertices, kind)
+    _lat, _lon, zoom = bench(get_center_and_zoom, gdf, vertices=vertices)
+    assert 2 <= zoom <= 10
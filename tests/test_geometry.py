@@ -0,0 +1,59 @@
+import numpy as np
+import shapely
+from common.geometry import flatten, from_shapely, simplify, summarize_flat
+
+TRIANGLE = shapely.Polygon([(0, 0), (1, 0), (1, 1)])
+EMPTY_POLYGON = shapely.from_geojson('{"type": "Polygon", "coordinates": []}')
+
+
+def test_from_shapely_skips_empty_polygons():
+    geometries = np.array(
+        [TRIANGLE, EMPTY_POLYGON, shapely.MultiPolygon([TRIANGLE, EMPTY_POLYGON])]
+    )
+    flat = from_shapely(geometries)
+
+    assert flat is not None
+    assert flat.num_features == 3
+    assert np.diff(flat.feature_offsets).tolist() == [1, 0, 1]
+    assert np.diff(flat.polygon_offsets).tolist() == [1, 1]
+
+
+def test_from_shapely_matches_flatten():
+    geometries = np.array([TRIANGLE, EMPTY_POLYGON])
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {},
+                "geometry": shapely.geometry.mapping(g),
+            }
+            for g in geometries
+        ],
+    }
+    flat = from_shapely(geometries)
+    expected = flatten(geojson)
+
+    assert flat is not None
+    for name in ("ring_offsets", "polygon_offsets", "feature_offsets"):
+        assert getattr(flat, name).tolist() == getattr(expected, name).tolist()
+
+
+def test_simplify_and_summarize_with_empty_polygon():
+    flat = from_shapely(np.array([EMPTY_POLYGON, TRIANGLE]))
+    assert flat is not None
+
+    simplified = simplify(flat, 0.1)
+    summary = summarize_flat(flat)
+
+    assert simplified.num_features == 2
+    assert summary.num_polygons == 1
+    assert summary.bbox == (0.0, 0.0, 1.0, 1.0)
+
+
+def test_only_empty_polygons():
+    flat = from_shapely(np.array([EMPTY_POLYGON]))
+    assert flat is not None
+
+    assert flat.num_polygons == 0
+    assert simplify(flat, 0.1).num_features == 1
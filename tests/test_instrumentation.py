@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = """
+from common.instrumentation import timed
+
+@timed("fetch", size=len)
+def fetch():
+    return b"x" * 10
+
+with timed("step1"):
+    fetch()
+"""
+
+
+def test_timings_are_logged_when_enabled():
+    env = {**os.environ, "APP_TIMINGS": "1", "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    records = [
+        json.loads(line.split("timing ", 1)[1])
+        for line in result.stderr.splitlines()
+        if "common.instrumentation: timing " in line
+    ]
+    assert [(r["name"], r["bytes"]) for r in records] == [
+        ("step1/fetch", 10),
+        ("step1", None),
+    ]
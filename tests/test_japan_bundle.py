@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from common import japan_bundle
+from common.japan_bundle import (
+    BUNDLE_DIR,
+    JapanBundle,
+    build_bundle,
+    bundle_version,
+    get_bundle,
+)
+
+
+class FakeLoader:
+    def __init__(self, name):
+        self.name = name
+
+    def load(self, url):
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "properties": {"N03_004": self.name},
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [[[135, 35], [136, 35], [136, 36], [135, 35]]],
+                    },
+                }
+            ],
+        }
+
+
+def build(monkeypatch, out, name):
+    monkeypatch.setattr(japan_bundle, "get_loader", lambda: FakeLoader(name))
+    return build_bundle(str(out), layers=("prefecture", "13"))
+
+
+def test_missing_bundle(tmp_path):
+    assert get_bundle(str(tmp_path / "none")) is None
+    assert bundle_version(str(tmp_path / "none")) is None
+
+
+def test_rebuild_keeps_open_bundle_and_is_picked_up(monkeypatch, tmp_path):
+    out = tmp_path / "bundle"
+    build(monkeypatch, out, "old")
+    old = get_bundle(str(out))
+    assert isinstance(old, JapanBundle)
+    assert get_bundle(str(out)) is old
+
+    version = build(monkeypatch, out, "new")
+    # 置き換えられた後も開いていたバンドルは読める
+    assert old.properties("13") == [{"N03_004": "old"}]
+    assert len(old.layer("13").coords) == 4
+
+    new = get_bundle(str(out))
+    assert new is not old
+    assert new is not None
+    assert new.version == version
+    assert new.properties("13") == [{"N03_004": "new"}]
+    assert bundle_version(str(out)) == version != old.version
+
+
+def test_default_dir_does_not_depend_on_cwd(monkeypatch, tmp_path):
+    if "JAPAN_BUNDLE_DIR" in os.environ:
+        pytest.skip("JAPAN_BUNDLE_DIR is set")
+    monkeypatch.chdir(tmp_path)
+    app_dir = os.path.dirname(os.path.dirname(japan_bundle.__file__))
+    assert os.path.samefile(os.path.dirname(BUNDLE_DIR), app_dir)
@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+
+from common import quiz_stats
+from common.quiz_stats import STATS_FILE, ingest, iter_answer_chunks
+
+VALID = [
+    {"code": 13, "is_correct": True},
+    {"pref": "北海道", "is_correct": False},
+    {"code": 47, "is_correct": True},
+]
+MALFORMED = [
+    '{"pref": [1], "is_correct": true}',  # unhashable pref
+    '{"pref": {"a": 1}}',
+    '{"code": true, "is_correct": true}',  # bool is not a code
+    '{"code": 0}',
+    '{"code": 48}',
+    '{"code": 13.0}',
+    '{"code": "13"}',
+    '{"pref": "どこか"}',
+    "[1, 2]",  # not an object
+    '"text"',
+    "null",
+    "{not json",
+]
+
+
+def write_log(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_ingest_skips_malformed_records(tmp_path):
+    lines = [json.dumps(r, ensure_ascii=False) for r in VALID] + MALFORMED + [""]
+    frame, skipped = ingest([write_log(tmp_path / "answers.ndjson", lines)])
+
+    assert skipped == len(MALFORMED)
+    assert int(frame["attempts"].sum()) == len(VALID)
+    assert frame.loc[13].tolist() == [1, 1]
+    assert frame.loc[1].tolist() == [1, 0]
+    assert frame.loc[47].tolist() == [1, 1]
+
+
+def test_ingest_gzip_and_chunks(tmp_path):
+    path = tmp_path / "answers.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for _ in range(5):
+            f.write('{"code": 13, "is_correct": true}\n')
+        f.write('{"pref": [13]}\n')
+
+    frame, skipped = ingest([str(path)], chunk_size=2)
+
+    assert skipped == 1
+    assert frame.loc[13].tolist() == [5, 5]
+
+
+def test_iter_answer_chunks_reports_skipped_per_chunk():
+    lines = [b'{"code": 1}', b'{"code": true}', b'{"code": 2}', b"[]"]
+    chunks = [
+        (codes.tolist(), skipped) for codes, _c, skipped in iter_answer_chunks(lines, 2)
+    ]
+
+    assert chunks == [([1, 2], 1), ([], 1)]
+
+
+def test_default_stats_file_is_at_repository_root(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    app_dir = os.path.dirname(os.path.dirname(quiz_stats.__file__))
+    assert os.path.isabs(STATS_FILE)
+    assert STATS_FILE == os.path.join(os.path.dirname(app_dir), "stats.json")
@@ -0,0 +1,99 @@
+import io
+import json
+import zipfile
+
+import geopandas as gpd
+import pandas as pd
+import pyogrio
+import pytest
+from common.shapefile import (
+    count_features,
+    encode_layer,
+    read_chunks,
+    shapefile_archive,
+)
+from shapely.geometry import Point
+
+FEATURES = [
+    {
+        "type": "Feature",
+        "properties": {"name": "triangle"},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[135, 35], [135.5, 35], [135.5, 35.5], [135, 35]]],
+        },
+    },
+    {
+        "type": "Feature",
+        "properties": {"name": "empty"},
+        "geometry": {"type": "Polygon", "coordinates": []},
+    },
+]
+
+
+def read_geojson(features):
+    data = json.dumps({"type": "FeatureCollection", "features": features})
+    return pyogrio.read_dataframe(data.encode("utf-8"))
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.02])
+def test_encode_layer_with_empty_polygon(tolerance):
+    gdf = read_geojson(FEATURES)
+
+    encoded = encode_layer(gdf, ["name"], tolerance)
+
+    records = json.loads(encoded.data.json)
+    assert encoded.layer_type == "PolygonLayer"
+    assert [r["properties"]["name"] for r in records] == ["triangle"]
+
+
+def test_encode_layer_with_only_empty_polygons():
+    gdf = read_geojson(FEATURES[1:])
+
+    encoded = encode_layer(gdf, ["name"], 0.02)
+
+    assert json.loads(encoded.data.json)["features"] == []
+
+
+def test_encode_layer_points_with_datetime():
+    gdf = gpd.GeoDataFrame(
+        {"name": ["a", "b"], "date": pd.to_datetime(["2024-01-02 03:04:05", None])},
+        geometry=[Point(135, 35), Point(136, 36)],
+        crs="EPSG:4326",
+    )
+
+    encoded = encode_layer(gdf)
+
+    collection = json.loads(encoded.data.json)
+    assert encoded.layer_type == "GeoJsonLayer"
+    assert [f["properties"] for f in collection["features"]] == [
+        {"name": "a", "date": "2024-01-02T03:04:05.000"},
+        {"name": "b", "date": None},
+    ]
+    assert collection["features"][0]["geometry"]["coordinates"] == [135.0, 35.0]
+
+
+def zip_shapefile(tmp_path, folder):
+    gdf = read_geojson(FEATURES[:1])
+    gdf.to_file(tmp_path / "foo.shp")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path in sorted(tmp_path.glob("foo.*")):
+            archive.write(path, f"{folder}{path.name}")
+        # macOS adds resource forks that must not be mistaken for the layer
+        archive.writestr(f"__MACOSX/{folder}._foo.shp", b"")
+    return buffer.getvalue()
+
+
+def test_shapefile_archive_nested_folder(tmp_path):
+    data = shapefile_archive(zip_shapefile(tmp_path, "foo/"))
+    assert count_features(data) == 1
+    (chunk,) = read_chunks(data)
+    assert chunk["name"].tolist() == ["triangle"]
+    assert chunk.crs is not None
+
+
+def test_shapefile_archive_root_is_unchanged(tmp_path):
+    data = zip_shapefile(tmp_path, "")
+    assert shapefile_archive(data) is data
+    assert count_features(data) == 1
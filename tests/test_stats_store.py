@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+
+import pytest
+from common import quiz_stats
+from common.quiz_stats import StatsStore, load_global_stats
+
+TOKYO = {"東京都": {"pref": "東京都", "attempts": 1, "corrects": 1}}
+OSAKA = {"大阪府": {"pref": "大阪府", "attempts": 1, "corrects": 0}}
+
+
+def append_many(path, count, compact_log_bytes):
+    store = StatsStore(path, compact_log_bytes)
+    for i in range(count):
+        store.append(TOKYO if i % 2 else OSAKA)
+
+
+def test_concurrent_appends_from_processes(tmp_path):
+    path = str(tmp_path / "stats.json")
+    processes, count = 4, 200
+    # ログを小さく保ち、追記と圧縮が競合するようにする
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=append_many, args=(path, count, 2048))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    stats = StatsStore(path).aggregate()
+    assert stats["東京都"]["attempts"] == processes * count // 2
+    assert stats["東京都"]["corrects"] == processes * count // 2
+    assert stats["大阪府"]["attempts"] == processes * count // 2
+    assert stats["大阪府"]["corrects"] == 0
+
+
+def test_compact_folds_log_into_snapshot(tmp_path):
+    path = str(tmp_path / "stats.json")
+    store = StatsStore(path)
+    store.save({"東京都": {"pref": "東京都", "attempts": 5, "corrects": 2}})
+    store.append(TOKYO)
+    store.append(OSAKA)
+    assert os.path.getsize(store.log_path) > 0
+
+    store.compact()
+    assert os.path.getsize(store.log_path) == 0
+    snapshot = load_global_stats(path)
+    assert snapshot["東京都"]["attempts"] == 6
+    assert snapshot["大阪府"]["attempts"] == 1
+
+    # 圧縮後の追記も、別のインスタンスから読める
+    store.append(TOKYO)
+    stats = StatsStore(path).aggregate()
+    assert stats["東京都"]["attempts"] == 7
+    assert stats["東京都"]["corrects"] == 4
+
+
+def test_crash_between_snapshot_and_log_swap(monkeypatch, tmp_path):
+    path = str(tmp_path / "stats.json")
+    store = StatsStore(path)
+    store.append(TOKYO)
+    store.append(TOKYO)
+
+    def crash(path):
+        raise OSError("crashed")
+
+    # スナップショットを書いた直後、ログを空にする前に落ちる
+    with monkeypatch.context() as m:
+        m.setattr(quiz_stats, "_replace_with_empty", crash)
+        with pytest.raises(OSError):
+            store.compact()
+    assert os.path.getsize(store.log_path) > 0
+
+    # ログに残った行はスナップショットに含まれているので数え直さない
+    assert StatsStore(path).aggregate()["東京都"]["attempts"] == 2
+    StatsStore(path).append(TOKYO)
+    assert StatsStore(path).aggregate()["東京都"]["attempts"] == 3
+    assert store.aggregate()["東京都"]["attempts"] == 3
+
+    # 次の圧縮で元に戻る
+    StatsStore(path).compact()
+    assert os.path.getsize(store.log_path) == 0
+    assert StatsStore(path).aggregate()["東京都"]["attempts"] == 3
+    assert load_global_stats(path)["東京都"]["attempts"] == 3
+
+
+def test_truncated_last_line(tmp_path):
+    path = str(tmp_path / "stats.json")
+    StatsStore(path).append(TOKYO)
+    # 異常終了したプロセスが書きかけた行
+    with open(f"{path}.log", "ab") as f:
+        f.write('{"東京都": {"attempts": 9'.encode())
+
+    reader = StatsStore(path)
+    assert reader.aggregate()["東京都"]["attempts"] == 1
+
+    # 続く追記は書きかけの行に巻き込まれない
+    StatsStore(path).append(TOKYO)
+    assert reader.aggregate()["東京都"]["attempts"] == 2
+    assert StatsStore(path).aggregate()["東京都"]["attempts"] == 2
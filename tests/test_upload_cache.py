@@ -0,0 +1,45 @@
+import geopandas as gpd
+from shapely.geometry import Point
+
+from common.upload_cache import UploadCache, estimate_nbytes
+
+
+def points(n: int) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {"id": range(n)}, geometry=[Point(i, i) for i in range(n)], crs="EPSG:4326"
+    )
+
+
+def test_hit_skips_load():
+    cache = UploadCache()
+    gdf = points(3)
+    assert cache.get_or_load("a", lambda: gdf) is gdf
+    assert cache.get_or_load("a", lambda: None) is gdf
+    assert "a" in cache
+
+
+def test_failed_load_is_not_cached():
+    cache = UploadCache()
+    assert cache.get_or_load("a", lambda: None) is None
+    assert "a" not in cache
+
+
+def test_evicts_least_recently_used():
+    one = estimate_nbytes(points(10))
+    cache = UploadCache(max_bytes=2 * one)
+    cache.get_or_load("a", lambda: points(10))
+    cache.get_or_load("b", lambda: points(10))
+    cache.get_or_load("a", lambda: None)  # touch a so b is the oldest
+    cache.get_or_load("c", lambda: points(10))
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.total_bytes == 2 * one
+
+
+def test_key_locks_do_not_accumulate():
+    one = estimate_nbytes(points(10))
+    cache = UploadCache(max_bytes=one)
+    for i in range(100):
+        cache.get_or_load(str(i), lambda: points(10))
+    cache.get_or_load("none", lambda: None)
+    assert len(cache._key_locks) == 0